@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import List
+
+from symai import Symbol
+
+from cache import DEFAULT_CACHE_PATH, ResponseCache
+from components import Context
+from files import write_atomic
+from func import DEFAULT_SPEC, TEMPLATE_DIR, DocumentGenerator, build_paper
+from latex import compile_in
+from manifest import BuildManifest
+from scheduler import RateLimiter, Scheduler
+
+
+DEFAULT_WORK_DIR  = (Path(__file__).parent.absolute() / "tmp" / "batch").as_posix()
+# static template files linked into every work directory; generated files stay local
+TEMPLATE_SUFFIXES = {'.sty', '.bst', '.bib', '.template'}
+
+
+def load_specs(path: str) -> List[dict]:
+    with open(path, 'r') as file:
+        if Path(path).suffix in ('.yaml', '.yml'):
+            import yaml
+            data = yaml.safe_load(file)
+        else:
+            data = json.load(file)
+    papers = data['papers'] if isinstance(data, dict) else data
+    specs  = [{**DEFAULT_SPEC, **paper} for paper in papers]
+    names  = [spec['name'] for spec in specs]
+    assert len(names) == len(set(names)), f"Paper names must be unique: {names}."
+    return specs
+
+
+def spec_hash(spec: dict) -> str:
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def link_template(work_dir: Path, template_dir: Path = TEMPLATE_DIR):
+    work_dir.mkdir(parents=True, exist_ok=True)
+    for file in template_dir.iterdir():
+        target = work_dir / file.name
+        if file.suffix not in TEMPLATE_SUFFIXES or target.exists():
+            continue
+        try:
+            os.symlink(file, target)
+        except OSError:
+            try:
+                os.link(file, target)
+            except OSError:
+                shutil.copy2(file, target)
+
+
+class PaperState:
+    # per-paper progress persisted in the work directory to resume after a crash
+    def __init__(self, work_dir: Path, spec: dict):
+        self.path = work_dir / "state.json"
+        self.data = {"name": spec['name'], "spec": spec_hash(spec), "stage": "pending",
+                     "generate_s": None, "compile_s": None, "usage": None, "error": None}
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            if data.get("spec") == self.data["spec"]:
+                self.data = data
+
+    def update(self, **kwargs):
+        self.data.update(kwargs)
+        write_atomic(self.path, json.dumps(self.data, indent=2))
+
+
+def generate(spec: dict, work_dir: Path, workers: int) -> tuple:
+    start = time.monotonic()
+    paper = build_paper(spec,
+                        scheduler=Scheduler(max_workers=workers),
+                        manifest=BuildManifest((work_dir / "manifest.json").as_posix()))
+    res   = DocumentGenerator()(Symbol(spec['task']), paper)
+    DocumentGenerator.write_document("main", work_dir, {"author": spec['author'], **res.value})
+    paper.metrics.save((work_dir / "metrics.json").as_posix(), paper.scheduler.deps)
+    return time.monotonic() - start, paper.usage
+
+
+def run_batch(specs: List[dict],
+              work_root: str = DEFAULT_WORK_DIR,
+              papers: int = 4,
+              compiles: int = 2,
+              workers: int = 4,
+              compile_timeout: float = 300.0) -> List[dict]:
+    states = {}
+    for spec in specs:
+        work_dir = Path(work_root) / spec['name']
+        link_template(work_dir)
+        states[spec['name']] = (spec, work_dir, PaperState(work_dir, spec))
+
+    # model calls are I/O bound and share the global rate limiter; compiles are CPU bound
+    with ThreadPoolExecutor(max_workers=papers) as generators, \
+         ProcessPoolExecutor(max_workers=compiles, mp_context=multiprocessing.get_context('spawn')) as compilers:
+        pending = {}
+
+        def submit_compile(name):
+            _, work_dir, _ = states[name]
+            pending[compilers.submit(compile_in, "main", work_dir.as_posix(), compile_timeout)] = ('compile', name, time.monotonic())
+
+        for name, (spec, work_dir, state) in states.items():
+            if state.data['stage'] == 'compiled':
+                continue
+            if state.data['stage'] == 'generated':
+                submit_compile(name)
+            else:
+                pending[generators.submit(generate, spec, work_dir, workers)] = ('generate', name, time.monotonic())
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, name, started = pending.pop(future)
+                state = states[name][2]
+                try:
+                    res = future.result()
+                except Exception as e:
+                    state.update(stage='failed', error=f"{stage}: {e}")
+                    continue
+                if stage == 'generate':
+                    seconds, usage = res
+                    state.update(stage='generated', generate_s=seconds, usage=usage, error=None)
+                    submit_compile(name)
+                else:
+                    state.update(stage='compiled' if res.success else 'failed',
+                                 compile_s=time.monotonic() - started,
+                                 error=None if res.success else '; '.join(res.errors) or 'compile failed')
+    return [state.data for _, _, state in states.values()]
+
+
+def summary(rows: List[dict], prompt_price: float, completion_price: float) -> str:
+    header = f"{'paper':<24} {'stage':<10} {'generate':>9} {'compile':>8} {'calls':>6} {'tokens':>9} {'cost $':>8}"
+    lines  = [header, '-' * len(header)]
+    for row in rows:
+        usage = row['usage'] or {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        cost  = (usage['prompt_tokens'] * prompt_price + usage['completion_tokens'] * completion_price) / 1000
+        lines.append(f"{row['name']:<24} {row['stage']:<10} "
+                     f"{row['generate_s'] or 0:>8.1f}s {row['compile_s'] or 0:>7.1f}s {usage['calls']:>6} "
+                     f"{usage['prompt_tokens'] + usage['completion_tokens']:>9} {cost:>8.2f}")
+        if row['error']:
+            lines.append(f"  error: {row['error']}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate many papers from a YAML/JSON manifest of paper specs.")
+    parser.add_argument("manifest", help="YAML or JSON file with a `papers` list; unset fields default to func.DEFAULT_SPEC.")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="Root of the per-paper work directories.")
+    parser.add_argument("--papers", type=int, default=4, help="Papers generated concurrently.")
+    parser.add_argument("--compiles", type=int, default=2, help="LaTeX compiles run in parallel processes.")
+    parser.add_argument("--workers", type=int, default=4, help="Sections generated concurrently per paper.")
+    parser.add_argument("--rpm", type=float, default=60, help="Maximum model requests per minute across all papers.")
+    parser.add_argument("--tpm", type=float, default=150_000, help="Maximum model tokens per minute across all papers.")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="Location of the response cache database.")
+    parser.add_argument("--compile-timeout", type=float, default=300.0, help="Timeout in seconds per LaTeX/bibtex pass.")
+    parser.add_argument("--prompt-price", type=float, default=0.01, help="USD per 1K prompt tokens.")
+    parser.add_argument("--completion-price", type=float, default=0.03, help="USD per 1K completion tokens.")
+    args = parser.parse_args()
+
+    Context.cache   = ResponseCache(args.cache_path)
+    Context.limiter = RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+
+    rows = run_batch(load_specs(args.manifest), args.work_dir, papers=args.papers, compiles=args.compiles,
+                     workers=args.workers, compile_timeout=args.compile_timeout)
+    print(summary(rows, args.prompt_price, args.completion_price))
@@ -0,0 +1,532 @@
+import argparse
+import json
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from bibliography import Bibliography
+from blobs import BlobStore, BlobText
+from ingest import Ingestor
+from render import RenderPlan, prune_citations
+
+
+SRC_DIR          = Path(__file__).parent.absolute()
+# import-time budget for `components`, including the dependencies it imports eagerly except symai
+IMPORT_BUDGET_MS = 50.0
+IMPORT_EXCLUDED  = ("symai",)
+DEFAULT_BASELINE_PATH = SRC_DIR / "bench_baseline.json"
+# a measurement regresses when it exceeds the baseline by this factor
+REGRESSION_TOLERANCE  = 1.5
+# fields identifying a result across runs and lower-is-better measurements compared against the baseline
+IDENTITY_KEYS    = ("scenario", "mode", "entries", "module", "pages", "path", "kb")
+MEASUREMENTS     = ("cold_load_s", "warm_load_s", "lookup_us", "total_ms", "budgeted_ms", "seconds", "peak_rss_mb",
+                    "children_peak_rss_mb", "import_s", "end_to_end_s", "write_document_s", "us_per_kb",
+                    "retained_mb", "peak_mb")
+# synthetic pipelines of increasing size: cited papers, method source size and bibliography entries
+SCENARIOS        = [
+    {"scenario": "small",  "cites": 10,  "source_kb": 10,     "bib_entries": 1_000},
+    {"scenario": "medium", "cites": 50,  "source_kb": 100,    "bib_entries": 10_000},
+    {"scenario": "large",  "cites": 200, "source_kb": 1_000,  "bib_entries": 50_000},
+    {"scenario": "xlarge", "cites": 500, "source_kb": 10_000, "bib_entries": 100_000},
+]
+# fake engines per model tier: fixed latency and generation speed
+TIER_PROFILES    = {
+    "fast": {"latency": 0.005, "tokens_per_second": 8_000},
+    "standard": {"latency": 0.02, "tokens_per_second": 2_000},
+    "strong": {"latency": 0.05, "tokens_per_second": 800},
+    "vision": {"latency": 0.02, "tokens_per_second": 2_000},
+}
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    res   = func(*args, **kwargs)
+    return res, time.perf_counter() - start
+
+
+def synthetic_bib(path: Path, entries: int) -> list:
+    keys = [f"Author{i}:{i % 100:02d}" for i in range(entries)]
+    with open(path, 'w') as file:
+        for key in keys:
+            file.write(f"@article{{{key},\ntitle={{Synthetic paper {key}}},\nauthor={{A. Author and B. Author}},\nyear={{2023}},\njournal={{Journal of Benchmarks}}\n}}\n\n")
+    return keys
+
+
+def synthetic_pdf(path: Path, pages: int):
+    # minimal multi-page PDF with a filled figure-like shape per page
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(pages)), pages)]
+    for i in range(pages):
+        stream = f"0.{i % 10} 0.4 0.8 rg 72 {200 + i % 300} 450 300 re f BT /F1 24 Tf 72 720 Td (Figure page {i + 1}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                       f"/Resources << /Font << /F1 {3 + 2 * pages} 0 R >> >> >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out     = b"%PDF-1.4\n"
+    offsets = []
+    for n, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n{obj}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1')
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    path.write_bytes(out)
+
+
+def synthetic_source(path: Path, kb: int):
+    words = ["symbolic", "neural", "engine", "operator", "expression", "context", "inference", "graph", "token"]
+    rng   = random.Random(kb)
+    with open(path, 'w') as file:
+        written = 0
+        while written < kb * 1024:
+            paragraph = " ".join(rng.choice(words) for _ in range(120)) + "\n\n"
+            file.write(paragraph)
+            written  += len(paragraph)
+
+
+def run_pipeline(work_dir: str, cites: int, source_kb: int, bib_entries: int, latency: float = 0.01,
+                 tokens_per_second: float = None, failure_rate: float = 0.0, workers: int = 8,
+                 routing: bool = False, deadline: float = None, **kwargs) -> dict:
+    # runs in a fresh interpreter per scenario so that import time and peak RSS are not shared
+    import resource
+    start = time.perf_counter()
+    from symai import Symbol
+    from batch import link_template
+    from components import Context, Introduction, Method, Paper, RelatedWork, Source, Abstract, Title, Cite
+    from engines import RoutedEngine, SyntheticEngine
+    from routing import DEFAULT_TIERS, ModelRouter
+    from func import DocumentGenerator
+    from scheduler import Scheduler
+    import_s = time.perf_counter() - start
+
+    work   = Path(work_dir)
+    papers = work / "papers"
+    papers.mkdir(parents=True, exist_ok=True)
+    bib    = (work / "references.bib").as_posix()
+    keys   = synthetic_bib(Path(bib), bib_entries)[:cites]
+    # the serialized key index stays in the work directory; Sources and write_document share this instance
+    Bibliography.load(bib, index_dir=(work / "index").as_posix())
+    link_template(work)
+    for key in keys:
+        (papers / f"{key}.txt").write_text(f"Synthetic paper {key}.\n\n" + "method results discussion " * 100)
+    synthetic_source(work / "source.txt", source_kb)
+
+    Context.cache   = None
+    Context.limiter = None
+    Context.router  = None
+    Source.loads.clear()
+    # one unknown key per completion exercises citation filtering
+    if routing:
+        tiers  = {tier.model: SyntheticEngine(failure_rate=failure_rate, citations=keys + ["Unknown:00"], **TIER_PROFILES[name])
+                  for name, tier in DEFAULT_TIERS.items()}
+        Context.router = ModelRouter(deadline=deadline)
+        # unrouted calls such as the source's BibTeX parse go to the router's default tier
+        engine = RoutedEngine(tiers, default=Context.router.tiers[Context.router.default].model).install()
+    else:
+        engine = SyntheticEngine(latency=latency, tokens_per_second=tokens_per_second,
+                                 failure_rate=failure_rate, citations=keys + ["Unknown:00"]).install()
+    half   = len(keys) // 2
+    paper  = Paper(
+        Method(Source(file_link=(work / "source.txt").as_posix(), bib_path=bib)),
+        RelatedWork(*[Cite(bib_link=key, bib_path=bib, papers_dir=papers.as_posix()) for key in keys[:half]]),
+        Introduction(*[Cite(bib_link=key, bib_path=bib, papers_dir=papers.as_posix()) for key in keys[half:]]),
+        Abstract(),
+        Title(),
+        context="[Global Context]\nWrite a synthetic benchmark paper.",
+        scheduler=Scheduler(max_workers=workers),
+    )
+    if Context.router is not None:
+        Context.router.start()
+    res, end_to_end = timed(DocumentGenerator(), Symbol("[Objective]\nWrite a synthetic paper."), paper)
+    _, write        = timed(DocumentGenerator.write_document, "main", work, {"author": "\\author{Benchmark}", **res.value})
+    return {
+        "import_s": import_s,
+        "end_to_end_s": end_to_end,
+        "write_document_s": write,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "calls": sum(engine.calls.values()) if routing else engine.calls,
+        "failures": sum(e.failures for e in engine.engines.values()) if routing else engine.failures,
+        "retries": paper.metrics.totals()["retries"],
+        **({"tiers": Context.router.report} if routing else {}),
+    }
+
+
+def bench_pipeline(scenarios=SCENARIOS, latency: float = 0.01, tokens_per_second: float = 2_000,
+                   failure_rate: float = 0.02, **options) -> list:
+    results = []
+    for scenario in scenarios:
+        with tempfile.TemporaryDirectory() as tmp:
+            kwargs = {**scenario, "work_dir": tmp, "latency": latency,
+                      "tokens_per_second": tokens_per_second, "failure_rate": failure_rate, **options}
+            script = "import json, sys\nfrom bench import run_pipeline\nprint(json.dumps(run_pipeline(**json.loads(sys.argv[1]))))"
+            proc   = subprocess.run([sys.executable, "-c", script, json.dumps(kwargs)], cwd=SRC_DIR, capture_output=True, text=True)
+            result = dict(scenario)
+            if proc.returncode != 0:
+                result["error"] = proc.stderr.strip().splitlines()[-1]
+            else:
+                result.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+            results.append(result)
+    return results
+
+
+def regressions(name: str, results: list, baseline: dict, tolerance: float = REGRESSION_TOLERANCE) -> list:
+    found = []
+    for res in results:
+        ident = {key: res[key] for key in IDENTITY_KEYS if key in res}
+        base  = next((b for b in baseline.get(name, []) if all(b.get(k) == v for k, v in ident.items())), None)
+        if base is None:
+            continue
+        for key in MEASUREMENTS:
+            if key in res and base.get(key) and res[key] > base[key] * tolerance:
+                found.append({**ident, "measurement": key, "baseline": base[key], "value": res[key]})
+    return found
+
+
+def failures(results: list, regressed: list) -> list:
+    # results that crashed or exceeded their budget, and regressed measurements
+    return [res for res in results if "error" in res or not res.get("within_budget", True)] + regressed
+
+
+def legacy_render(template: str, content: dict, keys) -> str:
+    # previous write_document: one scan per placeholder and per distinct \citep
+    for key, value in content.items():
+        template = template.replace(f"%TODO{{{key}}}", value)
+    for cite in set(re.findall(r"\\citep{.*?}", template)):
+        if cite[7:-1] not in keys:
+            template = template.replace(cite, "")
+    return template
+
+
+def synthetic_document(kb: int, keys: list) -> str:
+    # paragraphs with valid, unknown and multi-key citations
+    rng   = random.Random(kb)
+    parts = []
+    size  = 0
+    while size < kb * 1024:
+        cites = [f"\\citep{{{rng.choice(keys)}}}", f"\\citep{{Unknown{rng.randrange(1000)}:00}}",
+                 f"\\citet{{{rng.choice(keys)}}}",
+                 f"\\citep[see][]{{{rng.choice(keys)},Unknown{rng.randrange(1000)}:00}}"]
+        part  = "Synthetic paragraph text on neuro-symbolic programming " * 8 + " ".join(cites) + "\n\n"
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)
+
+
+def bench_render(sizes=(100, 1_000, 10_000), entries: int = 10_000) -> list:
+    # time per KB stays flat when rendering scales linearly
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        keys     = synthetic_bib(Path(tmp) / "references.bib", entries)
+        keyset   = Bibliography(Path(tmp) / "references.bib", index_dir=Path(tmp) / "index")
+        keyset.entries
+        template = (SRC_DIR / "template" / "main.tex.template").read_text()
+        for kb in sizes:
+            content = {"title": "\\title{Benchmark}", "author": "\\author{Benchmark}", "abstract": "",
+                       "document": synthetic_document(kb, keys), "appendix": ""}
+            _, legacy = timed(legacy_render, template, content, keyset)
+            plan      = RenderPlan(template)
+            _, single = timed(lambda: prune_citations(plan.render(content), keyset))
+            results.append({
+                "kb": kb,
+                "legacy_s": legacy,
+                "seconds": single,
+                "us_per_kb": single / kb * 1e6,
+            })
+    return results
+
+
+def bench_blobs(cites: int = 200, paper_kb: int = 50, source_kb: int = 10_000, sources: int = 3, reads: int = 3) -> list:
+    # memory of the Source/Cite payloads: one copy per instance and a fresh string per history()
+    # access (previous layout) against the shared blob store, and the real hierarchy of `cites` Cites
+    # and `sources` method Sources reading their whole source; mapped blobs are outside the Python heap
+    import tracemalloc
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        bib    = Path(tmp) / "references.bib"
+        keys   = synthetic_bib(bib, cites + 1)
+        papers = []
+        for key in keys[:cites]:
+            path = Path(tmp) / f"{key}.txt"
+            path.write_text(f"Synthetic cited paper {key}.\n\n" + "results discussion " * (paper_kb * 1024 // 19))
+            papers.append(path)
+        source = Path(tmp) / f"{keys[cites]}.txt"
+        synthetic_source(source, source_kb)
+        paths  = papers + [source] * sources
+
+        def legacy():
+            records, texts = [], {}
+            for i, path in enumerate(paths):
+                content = texts.setdefault(path, path.read_text())
+                records.append(f"[PAPER::Key{i}]: <<<\n{content}\n>>>\n[BIBLIOGRAPHY::Key{i}]: <<<\n@article{{Key{i}}}\n>>>\n")
+            for _ in range(reads):
+                for record in records:
+                    len(f"{[record]}")
+            return records
+
+        def shared():
+            store, records, ids = BlobStore(Path(tmp) / "blobs"), [], {}
+            for i, path in enumerate(paths):
+                blob = ids.setdefault(path, store.put(path.read_text()))
+                records.append(BlobText(store, [f"[PAPER::Key{i}]: <<<\n", (blob,),
+                                                f"\n>>>\n[BIBLIOGRAPHY::Key{i}]: <<<\n@article{{Key{i}}}\n>>>\n"]))
+            for _ in range(reads):
+                for record in records:
+                    len(record)
+            return records
+
+        def hierarchy():
+            # the components' own Source/Cite nodes, sending whole sources through `context_for`
+            from components import Algorithm, Cite, Implementation, Method, RelatedWork, Source
+            saved = Source.__dict__['blobs'], Source.token_budget
+            try:
+                Bibliography.load(bib.as_posix(), index_dir=(Path(tmp) / "index").as_posix())
+                Source.loads.clear()
+                Source.blobs        = BlobStore(Path(tmp) / "nodes")
+                Source.token_budget = None
+                cite    = lambda key: Cite(bib_link=key, bib_path=bib.as_posix(), papers_dir=tmp)
+                methods = [Method, Algorithm, Implementation]
+                nodes   = [RelatedWork(*[cite(key) for key in keys[:cites]])] + \
+                          [methods[i % len(methods)](Source(bib_link=keys[cites], bib_path=bib.as_posix(), papers_dir=tmp))
+                           for i in range(sources)]
+                for _ in range(reads):
+                    for node in nodes:
+                        for child in node.children:
+                            len(child.context_for("", "Bench"))
+                return nodes
+            finally:
+                Source.blobs, Source.token_budget = saved
+
+        for name, layout in [("legacy", legacy), ("blob_store", shared), ("hierarchy", hierarchy)]:
+            tracemalloc.start()
+            try:
+                start   = time.perf_counter()
+                records = layout()
+                seconds = time.perf_counter() - start
+                current, peak = tracemalloc.get_traced_memory()
+                results.append({"path": name, "cites": cites, "seconds": seconds,
+                                "retained_mb": current / 2 ** 20, "peak_mb": peak / 2 ** 20})
+                del records
+            except ImportError as e:
+                # the hierarchy needs the symai runtime
+                results.append({"path": name, "cites": cites, "error": repr(e)})
+            finally:
+                tracemalloc.stop()
+    return results
+
+
+def stand_in_server(latency: float):
+    # local HTTP server with ETag validation standing in for arXiv and publisher pages
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            n    = self.path.rsplit('/', 1)[-1]
+            etag = f'"paper-{n}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = (f"<html><head><script>track()</script></head><body><h1>Paper {n}</h1>"
+                    f"<p>{'Abstract of a synthetic paper. ' * 200}</p></body></html>").encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_ingest(urls: int = 50, latency: float = 0.05, max_per_host: int = 8) -> list:
+    # serial uncached downloads against concurrent pooled ingestion, cold and revalidated from the cache
+    from urllib.request import urlopen
+    server  = stand_in_server(latency)
+    links   = [f"http://127.0.0.1:{server.server_address[1]}/abs/{i}" for i in range(urls)]
+    parse   = lambda text: [f"@misc{{Paper{len(text)}", f" title={{{text.splitlines()[0]}}}}}"]
+    results = []
+    try:
+        _, serial = timed(lambda: [urlopen(link).read() for link in links])
+        results.append({"path": "serial", "urls": urls, "seconds": serial})
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("cold", "warm"):
+                ingestor = Ingestor(cache_dir=tmp, max_per_host=max_per_host)
+                _, seconds = timed(lambda: [f.result() for f in [ingestor.submit(link, parse) for link in links]])
+                results.append({"path": name, "urls": urls, "seconds": seconds, **ingestor.stats})
+    finally:
+        server.shutdown()
+    return results
+
+
+FIGURE_PATHS = {
+    # previous Image.forward: every page at 500 DPI held in memory as PIL images
+    "legacy": """
+from pdf2image import convert_from_path
+pages = convert_from_path(pdf, 500)
+pages[0].save(f"{out}/image_out.jpg", "JPEG")
+""",
+    "lean": """
+from figures import FigureStore
+FigureStore(out)(pdf)
+""",
+}
+
+
+def bench_figures(pages=(1, 10, 50)) -> list:
+    # each path runs in a fresh interpreter; peak RSS includes the pdftoppm children
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in pages:
+            pdf = Path(tmp) / f"figure-{count}.pdf"
+            synthetic_pdf(pdf, count)
+            for name, code in FIGURE_PATHS.items():
+                out    = Path(tmp) / f"{name}-{count}"
+                out.mkdir()
+                script = (f"import json, resource, time\npdf, out = {str(pdf)!r}, {str(out)!r}\nstart = time.perf_counter()\n"
+                          f"{code}\nprint(json.dumps([time.perf_counter() - start, "
+                          f"resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss]))")
+                proc   = subprocess.run([sys.executable, "-c", script], cwd=SRC_DIR, capture_output=True, text=True)
+                result = {"pages": count, "path": name}
+                if proc.returncode != 0:
+                    result["error"] = proc.stderr.strip().splitlines()[-1]
+                else:
+                    seconds, rss, children = json.loads(proc.stdout.strip().splitlines()[-1])
+                    result.update({"seconds": seconds, "peak_rss_mb": rss / 1024, "children_peak_rss_mb": children / 1024})
+                results.append(result)
+    return results
+
+
+def bench_bibliography(sizes=(10_000, 50_000, 100_000), lookups: int = 10_000) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path  = Path(tmp) / f"references-{size}.bib"
+            keys  = synthetic_bib(path, size)
+            index = Path(tmp) / "index"
+            # cold: parse and write the serialized index
+            _, cold   = timed(lambda: len(Bibliography(path, index_dir=index).entries))
+            # warm: new process-equivalent instance loading the serialized index
+            _, warm   = timed(lambda: len(Bibliography(path, index_dir=index).entries))
+            sample    = random.sample(keys, min(lookups, size))
+            loaded    = Bibliography(path, index_dir=index)
+            loaded.entries
+            _, lookup = timed(lambda: [key in loaded for key in sample])
+            results.append({
+                "entries": size,
+                "cold_load_s": cold,
+                "warm_load_s": warm,
+                "lookup_us": lookup / len(sample) * 1e6,
+            })
+    return results
+
+
+def import_times(log: str, module: str, excluded=IMPORT_EXCLUDED) -> tuple:
+    # cumulative import time of `module` and the part of it spent in the outermost imports of
+    # `excluded` packages; lines are `import time: <self us> | <cumulative us> | <indented module>`
+    # in post-order, so read in reverse every module line precedes those of its imports
+    total, skipped = 0, 0
+    stack = []
+    for line in reversed(log.splitlines()):
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if match is None:
+            continue
+        depth, name, cumulative = len(match.group(3)), match.group(4), int(match.group(2))
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        inside, skipping = stack[-1][1:] if stack else (False, False)
+        inside = inside or name == module
+        if name == module and not stack:
+            total = cumulative
+        if inside and not skipping and name.split(".")[0] in excluded:
+            skipped += cumulative
+            skipping = True
+        stack.append((depth, inside, skipping))
+    return total, skipped
+
+
+def bench_import_time(modules=("components", "func"), budgeted=("components",),
+                      budget_ms: float = IMPORT_BUDGET_MS) -> list:
+    # a fresh interpreter per module; third-party modules imported eagerly count towards the budget
+    results = []
+    for module in modules:
+        proc  = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=SRC_DIR, capture_output=True, text=True)
+        total, skipped = import_times(proc.stderr, module)
+        result = {
+            "module": module,
+            "total_ms": total / 1000,
+            "budgeted_ms": (total - skipped) / 1000,
+        }
+        if module in budgeted:
+            result["budget_ms"]     = budget_ms
+            result["within_budget"] = proc.returncode == 0 and (total - skipped) / 1000 <= budget_ms
+        if proc.returncode != 0:
+            result["error"] = proc.stderr.strip().splitlines()[-1]
+        results.append(result)
+    return results
+
+
+def bench_routing(scenario: str = "medium", deadline: float = 0.5) -> list:
+    # single model at the strong tier's profile against routed tiers, with and without a deadline
+    scenarios = [s for s in SCENARIOS if s["scenario"] == scenario]
+    strong    = TIER_PROFILES["strong"]
+    results   = []
+    for mode, options in [("single", {"latency": strong["latency"], "tokens_per_second": strong["tokens_per_second"]}),
+                          ("routed", {"routing": True}),
+                          ("deadline", {"routing": True, "deadline": deadline})]:
+        for result in bench_pipeline(scenarios, **options):
+            results.append({"mode": mode, **result})
+    return results
+
+
+BENCHMARKS = {
+    "bibliography": bench_bibliography,
+    "import_time": bench_import_time,
+    "figures": bench_figures,
+    "pipeline": bench_pipeline,
+    "render": bench_render,
+    "blobs": bench_blobs,
+    "ingest": bench_ingest,
+    "routing": bench_routing,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks.")
+    parser.add_argument("benchmarks", nargs="*", default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument("--check", action="store_true",
+                        help="Exit with a non-zero status if a benchmark failed, a budget is exceeded or a measurement regressed.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Stored results to compare against.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="Factor over the baseline at which a measurement counts as a regression.")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text()) if Path(args.baseline).exists() else {}
+    failed   = False
+    runs     = {}
+    for name in args.benchmarks:
+        results    = BENCHMARKS[name]()
+        runs[name] = results
+        regressed  = regressions(name, results, baseline, args.tolerance)
+        failed    |= bool(failures(results, regressed))
+        print(json.dumps({name: results, "regressions": regressed}, indent=2))
+    if args.update_baseline:
+        Path(args.baseline).write_text(json.dumps({**baseline, **runs}, indent=2))
+    sys.exit(1 if args.check and failed else 0)
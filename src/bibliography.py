@@ -0,0 +1,127 @@
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from files import stamp, write_atomic
+
+
+DEFAULT_INDEX_DIR = (Path(__file__).parent.absolute() / "tmp" / "cache" / "bib").as_posix()
+
+ENTRY_PATTERN = re.compile(r'^@(\w+)\s*\{\s*([^,\s]+)\s*,', re.MULTILINE)
+SKIPPED_TYPES = {'comment', 'string', 'preamble'}
+
+
+class Bibliography:
+    # key-indexed view over a .bib file; shared through `Bibliography.load`, which parses it again
+    # once the file changes
+    _instances: Dict[str, 'Bibliography'] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path: str, index_dir: Optional[str] = DEFAULT_INDEX_DIR):
+        self.path      = Path(path).absolute().as_posix()
+        self.index_dir = index_dir
+        self._entries: Optional[Dict[str, str]] = None
+        self._stamp: Optional[tuple] = None
+        self._added: Dict[str, str] = {}
+        self._entries_lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path: str, index_dir: Optional[str] = DEFAULT_INDEX_DIR) -> 'Bibliography':
+        # resolve symlinks so that linked work directories share one instance
+        path = Path(path).resolve().as_posix()
+        with cls._lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path, index_dir=index_dir)
+            res = cls._instances[path]
+        res.refresh()
+        return res
+
+    def refresh(self):
+        # drop the parsed entries if the file changed since they were loaded; a missing file
+        # is reported on first access
+        try:
+            current = stamp(self.path)
+        except OSError:
+            return
+        with self._entries_lock:
+            if self._entries is not None and current != self._stamp:
+                self._entries = None
+
+    @staticmethod
+    def parse(text: str) -> Dict[str, str]:
+        entries = {}
+        matches = list(ENTRY_PATTERN.finditer(text))
+        for i, match in enumerate(matches):
+            if match.group(1).lower() in SKIPPED_TYPES:
+                continue
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            entries.setdefault(match.group(2), text[match.start():end].strip())
+        return entries
+
+    @property
+    def entries(self) -> Dict[str, str]:
+        if self._entries is None:
+            with self._entries_lock:
+                if self._entries is None:
+                    self._entries = self._load_entries()
+        return self._entries
+
+    @property
+    def index_path(self) -> Optional[Path]:
+        if self.index_dir is None:
+            return None
+        name = hashlib.sha256(self.path.encode('utf-8')).hexdigest()[:16]
+        return Path(self.index_dir) / f"{Path(self.path).stem}-{name}.json"
+
+    def _load_entries(self) -> Dict[str, str]:
+        current     = list(stamp(self.path))
+        self._stamp = tuple(current)
+        index       = self.index_path
+        cached      = None
+        if index is not None and index.exists():
+            try:
+                with open(index, 'r', encoding='utf-8') as file:
+                    cached = json.load(file)
+            except Exception:
+                cached = None
+        # fast path: unchanged mtime and size
+        if cached is not None and cached['stamp'] == current:
+            return {**cached['entries'], **self._added}
+        with open(self.path, 'rb') as file:
+            raw = file.read()
+        checksum = hashlib.sha256(raw).hexdigest()
+        # touched but not modified: keep the parsed entries, refresh the stamp
+        if cached is not None and cached['checksum'] == checksum:
+            entries = cached['entries']
+        else:
+            entries = self.parse(raw.decode('utf-8', errors='replace'))
+        if index is not None:
+            write_atomic(index, json.dumps({'stamp': current, 'checksum': checksum, 'entries': entries}))
+        return {**entries, **self._added}
+
+    def add(self, key: str, entry: str):
+        # runtime-only entries, e.g. parsed from a source file or url; kept across reloads
+        with self._entries_lock:
+            self._added[key] = entry
+            self.entries[key] = entry
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.entries.get(key, default)
+
+    def keys(self):
+        return self.entries.keys()
+
+    def __getitem__(self, key: str) -> str:
+        return self.entries[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,163 @@
+import hashlib
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+from files import write_atomic
+
+
+DEFAULT_BLOB_DIR = (Path(__file__).parent.absolute() / "tmp" / "cache" / "blobs").as_posix()
+
+
+class BlobStore:
+    # process-wide interned texts keyed by their sha256; blobs above `mmap_threshold` bytes live
+    # in memory-mapped files instead of the heap (`mmap_threshold = None` keeps everything in memory).
+    # Decoded mapped blobs and joined BlobTexts are kept in an LRU of at most `decoded_chars`, so that
+    # repeated reads share one string; blob files unused for `max_age` seconds or beyond `max_bytes`
+    # are removed, least recently used first
+    def __init__(self,
+                 path: str = DEFAULT_BLOB_DIR,
+                 mmap_threshold: Optional[int] = 1 << 20,
+                 decoded_chars: int = 64 << 20,
+                 max_bytes: int = 2 << 30,
+                 max_age: float = 30 * 24 * 60 * 60):
+        self.path           = Path(path)
+        self.mmap_threshold = mmap_threshold
+        self.decoded_chars  = decoded_chars
+        self.max_bytes      = max_bytes
+        self.max_age        = max_age
+        self.interned       = 0
+        self.decoded_hits   = 0
+        self._texts: Dict[str, str]       = {}
+        self._maps: Dict[str, mmap.mmap]  = {}
+        self._lengths: Dict[str, int]     = {}
+        self._decoded: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock          = threading.Lock()
+
+    def put(self, text: str) -> str:
+        data   = text.encode('utf-8')
+        blob   = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if blob in self._lengths:
+                self.interned += 1
+                return blob
+        if self.mmap_threshold is not None and len(data) >= self.mmap_threshold:
+            mapped = self.map(blob, data)
+            with self._lock:
+                self._maps.setdefault(blob, mapped)
+        else:
+            with self._lock:
+                self._texts.setdefault(blob, text)
+        with self._lock:
+            self._lengths[blob] = len(text)
+        return blob
+
+    def map(self, blob: str, data: bytes) -> mmap.mmap:
+        target = self.path / f"{blob}.blob"
+        try:
+            # reused from an earlier run; the access time orders eviction
+            os.utime(target)
+        except FileNotFoundError:
+            write_atomic(target, data)
+            self.evict(keep=target)
+        with open(target, 'rb') as file:
+            # on POSIX the mapping stays valid if another process evicts the file
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def evict(self, keep: Optional[Path] = None):
+        now   = time.time()
+        files = []
+        for path in self.path.glob('*.blob'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        size = sum(entry[1] for entry in files)
+        for mtime, entry_size, path in sorted(files):
+            if now - mtime <= self.max_age and size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            size -= entry_size
+
+    def cached(self, key: Hashable, build: Callable[[], str]) -> str:
+        with self._lock:
+            text = self._decoded.get(key)
+            if text is not None:
+                self._decoded.move_to_end(key)
+                self.decoded_hits += 1
+                return text
+        text = build()
+        if len(text) > self.decoded_chars:
+            return text
+        with self._lock:
+            self._decoded[key] = text
+            self._decoded.move_to_end(key)
+            total = sum(len(value) for value in self._decoded.values())
+            while total > self.decoded_chars:
+                _, dropped = self._decoded.popitem(last=False)
+                total     -= len(dropped)
+        return text
+
+    def get(self, blob: str) -> str:
+        text = self._texts.get(blob)
+        if text is not None:
+            return text
+        # decoded once from the shared mapping, then served from the LRU
+        return self.cached(blob, lambda: self.decode(blob))
+
+    def decode(self, blob: str) -> str:
+        # a new string on every call for mapped blobs
+        text = self._texts.get(blob)
+        return text if text is not None else str(self._maps[blob], 'utf-8')
+
+    def view(self, blob: str) -> memoryview:
+        # zero-copy bytes of mapped blobs
+        if blob in self._maps:
+            return memoryview(self._maps[blob])
+        return memoryview(self._texts[blob].encode('utf-8'))
+
+    def length(self, blob: str) -> int:
+        return self._lengths[blob]
+
+    def __contains__(self, blob: str) -> bool:
+        return blob in self._lengths
+
+    def stats(self) -> dict:
+        return {
+            "blobs": len(self._lengths),
+            "mapped": len(self._maps),
+            "heap_chars": sum(len(text) for text in self._texts.values()),
+            "mapped_bytes": sum(len(mapped) for mapped in self._maps.values()),
+            "decoded_chars": sum(len(text) for text in self._decoded.values()),
+            "decoded_hits": self.decoded_hits,
+            "interned": self.interned,
+        }
+
+
+class BlobText:
+    # text assembled from literals and blob ids; joined only when converted to a string
+    def __init__(self, store: BlobStore, parts: List[Union[str, Tuple[str]]]):
+        # blob ids are wrapped in one-element tuples to tell them apart from literals
+        self.store = store
+        self.parts = parts
+
+    def __len__(self) -> int:
+        return sum(self.store.length(part[0]) if isinstance(part, tuple) else len(part) for part in self.parts)
+
+    def __str__(self) -> str:
+        # records sharing their parts share one joined string
+        return self.store.cached(('text', *self.parts), self.join)
+
+    def join(self) -> str:
+        # decoded without caching the blob itself, which the joined string already contains
+        return ''.join(self.store.decode(part[0]) if isinstance(part, tuple) else part for part in self.parts)
+
+    def __repr__(self) -> str:
+        return repr(str(self))
@@ -0,0 +1,93 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from retrieval import CHARS_PER_TOKEN, count_tokens
+
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+CITATION_PATTERN = re.compile(r"\\cite[a-zA-Z]*\*?(?:\[[^\]]*\])*\{[^}]*\}")
+ELLIPSIS         = " [...]"
+
+
+def allocate(sizes: List[int], budget: int, priorities: Optional[List[int]] = None) -> List[int]:
+    # higher priorities are served first; within one priority, water-filling: small parts stay whole,
+    # the largest ones share what is left equally
+    caps       = list(sizes)
+    remaining  = max(budget, 0)
+    priorities = priorities if priorities is not None else [0] * len(sizes)
+    for priority in sorted(set(priorities), reverse=True):
+        order = sorted((i for i in range(len(sizes)) if priorities[i] == priority), key=lambda i: sizes[i])
+        for n, i in enumerate(order):
+            share   = remaining // (len(order) - n)
+            caps[i] = min(sizes[i], share)
+            remaining -= caps[i]
+    return caps
+
+
+def compress(text: str, tokens: int) -> str:
+    # extractive: keep leading sentences within the budget, cut the first one if none fits; citations
+    # of dropped sentences follow the cut, so that compressed summaries still cite their sources
+    if count_tokens(text) <= tokens:
+        return text
+    citations = list(dict.fromkeys(CITATION_PATTERN.findall(text)))
+    reserved  = len(' '.join(citations)) + 1 if citations else 0
+    limit     = max(tokens * CHARS_PER_TOKEN - len(ELLIPSIS) - reserved, 0)
+    kept      = ''
+    for sentence in SENTENCE_PATTERN.split(text):
+        candidate = f"{kept} {sentence}" if kept else sentence
+        if len(candidate) > limit:
+            break
+        kept = candidate
+    # a cut inside a citation command drops its fragment
+    kept    = kept or re.sub(r"\\cite[^}]*$", '', text[:limit])
+    dropped = [citation for citation in citations if citation not in kept]
+    return kept + ELLIPSIS + (' ' + ' '.join(dropped) if dropped else '')
+
+
+class ContextBudget:
+    # per-section prompt budgets; the static context is kept, adapted (dynamic) contexts are
+    # compressed first and the section input is truncated only if it alone exceeds the budget.
+    # `priorities` rank adapted contexts by the section type that adapted them; higher ones keep
+    # their text first, unlisted ones have priority 0
+    def __init__(self,
+                 budgets: Optional[Dict[str, int]] = None,
+                 default: Optional[int] = None,
+                 priorities: Optional[Dict[str, int]] = None):
+        self.budgets    = dict(budgets or {})
+        self.default    = default
+        self.priorities = dict(priorities or {})
+        self.report: Dict[str, dict] = {}
+        self._lock   = threading.Lock()
+
+    def limit(self, section: str) -> Optional[int]:
+        return self.budgets.get(section, self.default)
+
+    def priority(self, source: Optional[str]) -> int:
+        return self.priorities.get(source, 0)
+
+    def fit(self, section: str, static: str, dynamic: List[str], task: List[str],
+            sources: Optional[List[Optional[str]]] = None) -> Tuple[List[str], List[str]]:
+        # `sources` names the section type that adapted each dynamic entry
+        before = {"static": count_tokens(static),
+                  "dynamic": sum(count_tokens(d) for d in dynamic),
+                  "task": sum(count_tokens(t) for t in task)}
+        limit  = self.limit(section)
+        if limit is not None and sum(before.values()) > limit:
+            available = max(limit - before["static"], 0)
+            task      = [compress(t, cap) for t, cap in zip(task, allocate([count_tokens(t) for t in task], available))]
+            available = max(available - sum(count_tokens(t) for t in task), 0)
+            ranks     = [self.priority(source) for source in sources] if sources is not None else None
+            dynamic   = [compress(d, cap) for d, cap in zip(dynamic, allocate([count_tokens(d) for d in dynamic], available, ranks))]
+        after  = {"static": before["static"],
+                  "dynamic": sum(count_tokens(d) for d in dynamic),
+                  "task": sum(count_tokens(t) for t in task)}
+        with self._lock:
+            entry = self.report.setdefault(section, {"calls": 0, "before": dict.fromkeys(before, 0),
+                                                     "after": dict.fromkeys(after, 0), "saved_tokens": 0})
+            entry["calls"] += 1
+            for key in before:
+                entry["before"][key] += before[key]
+                entry["after"][key]  += after[key]
+            entry["saved_tokens"] += sum(before.values()) - sum(after.values())
+        return dynamic, task
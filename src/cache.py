@@ -0,0 +1,119 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+
+DEFAULT_CACHE_PATH = (Path(__file__).parent.absolute() / "tmp" / "cache" / "responses.db").as_posix()
+
+
+class ResponseCache:
+    def __init__(self,
+                 path: str = DEFAULT_CACHE_PATH,
+                 max_entries: int = 10_000,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 max_age: float = 30 * 24 * 60 * 60,
+                 enabled: bool = True,
+                 refresh: Optional[Iterable[str]] = None):
+        self.path        = path
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self.max_age     = max_age
+        self.enabled     = enabled
+        self.refresh     = set(refresh or [])
+        self.hits        = 0
+        self.misses      = 0
+        self.writes      = 0
+        self._lock       = threading.Lock()
+        self._conn       = None
+
+    @staticmethod
+    def key(*parts) -> str:
+        # content address of all prompt components; order matters
+        blob = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    @property
+    def conn(self) -> 'sqlite3.Connection':
+        if self._conn is None:
+            import sqlite3
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                    key TEXT PRIMARY KEY,
+                                    section TEXT,
+                                    value TEXT NOT NULL,
+                                    size INTEGER NOT NULL,
+                                    created REAL NOT NULL,
+                                    accessed REAL NOT NULL)""")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or time.time() - row[1] > self.max_age:
+                return None
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key: str, value: str, section: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                              (key, section, value, len(value.encode('utf-8')), now, now))
+            self.conn.commit()
+            self.writes += 1
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            conn = self.conn
+            # drop expired entries first, then least recently used ones until within limits
+            conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age,))
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            if count > self.max_entries or size > self.max_bytes:
+                drop = []
+                for key, entry_size in conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC"):
+                    if count <= self.max_entries and size <= self.max_bytes:
+                        break
+                    drop.append((key,))
+                    count -= 1
+                    size  -= entry_size
+                conn.executemany("DELETE FROM responses WHERE key = ?", drop)
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def __call__(self,
+                 key: str,
+                 compute: Callable[[], str],
+                 section: Optional[str] = None,
+                 cacheable: Optional[Callable[[str], bool]] = None) -> str:
+        # values rejected by `cacheable` are returned but not stored, so the next call computes again
+        if self.enabled and section not in self.refresh:
+            value = self.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        value = str(compute())
+        if self.enabled and (cacheable is None or cacheable(value)):
+            self.put(key, value, section=section)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": self.hits / max(self.hits + self.misses, 1),
+        }
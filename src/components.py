@@ -1,15 +1,37 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
-from pdf2image import convert_from_path
+from typing import Callable, Optional
 
 from symai import Symbol, Expression, Function
 from symai.extended import BibTexParser
-from symai.components import Sequence, Parallel, FileReader
+from symai.components import FileReader
 from symai.extended import Conversation
+from symai.backend import settings
 from symai.post_processors import StripPostProcessor, CodeExtractPostProcessor
 
+from bibliography import Bibliography
+from blobs import BlobStore, BlobText
+from budget import ContextBudget
+from cache import ResponseCache
+from figures import FigureStore
+from files import stamp
+from ingest import Ingestor
+from manifest import BuildManifest, fingerprint
+from memo import RunMemo
+from metrics import RunMetrics
+from retrieval import LexicalIndex, count_tokens
+from routing import ModelRouter
+from scheduler import RateLimiter, Scheduler, dependencies, phases, retry
+from summaries import SummaryIndex
+from validate import LatexRules, headings, validate_latex
 
-DEFAULT_BIB_PATH = (Path(__file__).parent.absolute() / "documents" / "bib" / "references.bib").as_posix()
+
+DEFAULT_BIB_PATH   = (Path(__file__).parent.absolute() / "documents" / "bib" / "references.bib").as_posix()
+# extracted text of cited papers as `<bib key>.txt`
+DEFAULT_PAPERS_DIR = (Path(__file__).parent.absolute() / "documents" / "bib" / "related_work").as_posix()
 
 
 PAPER_STATIC_CONTEXT = """[General Context]
@@ -45,46 +67,366 @@ DO_NOT_ADD_ALGORITHMS   = """Do NOT REPEAT or ADD an algorithm if it is already
 class Paper(Expression):
     context = None
 
-    def __init__(self, *sequence, **kwargs):
+    def __init__(self,
+                 *sections,
+                 context: Optional[str] = None,
+                 scheduler: Optional[Scheduler] = None,
+                 manifest: Optional[BuildManifest] = None,
+                 **kwargs):
         super().__init__(**kwargs)
-        self.sequence   = Sequence(*sequence)
         self.conclusion = Conclusion()
+        self.sections   = [*sections, self.conclusion]
+        self.scheduler  = scheduler if scheduler is not None else Scheduler()
+        self.manifest   = manifest
+        # paper-scoped context so that several papers can be generated in one process
+        if context is not None:
+            self.context = context
+        self.dynamic    = {}
+        # section and subsection headings of the generated sections, by the node that emitted them first
+        self.headings   = {}
+        self.usage      = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self.metrics    = RunMetrics()
+        # identical Source/Cite summaries of this build share one model call;
+        # retrieval indexes are loaded once per source content
+        self.memo       = RunMemo()
+        self.indexes    = RunMemo()
+        self._lock      = threading.Lock()
+        self.bind(self.sections)
+        self.metrics.register(self.sections)
+
+    def bind(self, nodes):
+        for node in self.walk(nodes):
+            node.paper = self
+
+    def walk(self, nodes):
+        for node in nodes:
+            yield node
+            yield from self.walk(getattr(node, 'children', []))
+
+    def adapt_context(self, context, types, source: Optional[str] = None):
+        # entries remember the section type that adapted them, which ranks them under a budget
+        with self._lock:
+            for type_ in types:
+                self.dynamic.setdefault(type_, []).append((source, str(context)))
+
+    def dynamic_for(self, node) -> list:
+        # matched by isinstance: symai derives a new class for every instance, so `type(node)`
+        # is never one of the adapted types itself
+        with self._lock:
+            return [entry for type_, entries in self.dynamic.items() if isinstance(node, type_) for entry in entries]
+
+    def add_headings(self, node, text: str):
+        with self._lock:
+            for heading in headings(text):
+                self.headings.setdefault(heading, node)
+
+    def headings_of_others(self, node) -> set:
+        with self._lock:
+            return {heading for heading, owner in self.headings.items() if owner is not node}
+
+    def track(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.usage["calls"]             += 1
+            self.usage["prompt_tokens"]     += prompt_tokens
+            self.usage["completion_tokens"] += completion_tokens
+
+    def node_id(self, j: int) -> str:
+        return f"{j}:{type(self.sections[j]).__name__}"
+
+    def execute(self, j, results, task, **kwargs):
+        node = self.sections[j]
+        # sections summarizing the paper receive the body they depend on
+        if getattr(node, 'needs_body', False):
+            body = [str(results[i]) for i in sorted(self.scheduler.deps[j]) if results[i] is not None]
+            return node(task | "\n".join(body), **kwargs)
+        return node(task, **kwargs)
+
+    def build(self, j, results, task, **kwargs):
+        with self.metrics.span(self.sections[j]) as done:
+            res = self.rebuild(j, results, task, **kwargs)
+            done(res)
+        return res
+
+    def rebuild(self, j, results, task, **kwargs):
+        # incremental build: reuse the recorded output of clean nodes
+        if self.manifest is None:
+            return self.execute(j, results, task, **kwargs)
+        node     = self.sections[j]
+        node_id  = self.node_id(j)
+        inputs   = fingerprint(str(task), node.inputs())
+        upstream = [fingerprint(self.serialize(results[i])) for i in sorted(self.scheduler.deps[j])]
+        entry    = self.manifest.lookup(node_id, inputs, upstream)
+        if entry is not None:
+            # replay side effects on the dynamic context of downstream types and on the used headings
+            if entry['adapted'] is not None:
+                node.share(entry['adapted'])
+            output = entry['output']
+            if getattr(node, 'latex_rules', None) is not None:
+                self.add_headings(node, '\n'.join(output) if isinstance(output, list) else output)
+            self.manifest.reused.append(node_id)
+            self.metrics.get(node).reused = True
+            return Symbol(output)
+        res = self.execute(j, results, task, **kwargs)
+        self.manifest.record(node_id, inputs, upstream, self.serialize(res), adapted=getattr(node, 'adapted', None))
+        self.manifest.rebuilt.append(node_id)
+        # persist after every section so that an interrupted build resumes where it stopped
+        self.manifest.save()
+        return res
+
+    @staticmethod
+    def serialize(res):
+        value = getattr(res, 'value', res)
+        return [str(r) for r in value] if isinstance(value, list) else str(res)
+
+    def plan(self, task) -> list:
+        # which sections an incremental build would regenerate, and why
+        deps  = dependencies(self.sections)
+        order = [j for phase in phases(deps) for j in phase]
+        nodes = {self.node_id(j): fingerprint(str(task), self.sections[j].inputs()) for j in order}
+        return self.manifest.plan(nodes, {self.node_id(j): [self.node_id(i) for i in sorted(deps[j])] for j in order})
 
     def forward(self, task, **kwargs):
-        # execute the sequence of tasks
-        self.sequence(task, **kwargs)
-        # access results from the global root node metadata
-        results     = self.linker.results
-        # all other results except the title, abstract, cite and source:
-        document    = [results[key].__str__() for key in results if not any([task in key for task in ['Title', 'Abstract', 'Cite', 'Source', 'Parallel', 'Sequence', 'Image']]) and results[key].value_type == str]
+        results = None
+        for _, results in self.stream(task, **kwargs):
+            pass
+        return self.assemble(results)
+
+    def stream(self, task, **kwargs):
+        # execute independent sections concurrently along their data dependencies and
+        # yield `(node_id, results)` as soon as each section completes; pending results are None
+        results = [None] * len(self.sections)
+        # rasterize all figures up front in the figure worker pool
+        for node in self.walk(self.sections):
+            if isinstance(node, Image):
+                node.prefetch()
+        self.metrics.started = time.monotonic()
+        for j, res in self.scheduler.stream(self.sections, lambda j, results: self.build(j, results, task, **kwargs)):
+            results[j] = res
+            self.metrics.add(self.sections[j], queue_s=self.scheduler.timings[j][0] - self.scheduler.submitted[j])
+            yield self.node_id(j), results
+
+    def assemble(self, results, placeholder: Optional[Callable[[Expression], str]] = None):
+        # `placeholder(node)` renders sections that are still pending, otherwise they are left out
+        def render(node, res):
+            if res is None:
+                return placeholder(node) if placeholder is not None else None
+            return str(res)
+        # all body sections except the title, abstract, appendix and conclusion
+        document    = [render(node, res) for node, res in zip(self.sections, results) if getattr(node, 'body', False)]
         # reverse the order of the document to match the expected output
         document    = document[::-1]
         # get the appendix content
-        appendix    = [sec for key in results for sec in results[key].value if 'Appendix' in key]
+        appendix    = [str(sec) for node, res in zip(self.sections, results) if isinstance(node, Appendix) and res is not None
+                       for sec in getattr(res, 'value', res)]
         # add the conclusion
-        document.append(self.conclusion(task, **kwargs).__str__())
+        document.append(render(self.sections[-1], results[-1]))
         # create the final result
         result = Symbol({
-            "title": self.linker.find('Title').__str__(),
-            "abstract": self.linker.find('Abstract').__str__(),
-            "document": "\n".join(document),
+            "title": self.find(Title, results, placeholder),
+            "abstract": self.find(Abstract, results, placeholder),
+            "document": "\n".join(sec for sec in document if sec is not None),
             "appendix": "\n".join(appendix)
         })
         return result
 
+    def find(self, type_, results, placeholder=None) -> str:
+        for node, res in zip(self.sections, results):
+            if isinstance(node, type_):
+                if res is None:
+                    return placeholder(node) if placeholder is not None else ''
+                return str(res)
+        return ''
+
+
+class Concurrent(Expression):
+    # runs independent expressions on a thread pool; API pressure is bounded by `Context.limiter`
+    def __init__(self, *expr, max_workers: int = 4, **kwargs):
+        super().__init__(**kwargs)
+        self.expr        = expr
+        self.max_workers = max_workers
+
+    def forward(self, *args, **kwargs):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda e: e(*args, **kwargs), self.expr))
+
 
 class Context(Conversation):
+    cache: Optional[ResponseCache] = None
+    limiter: Optional[RateLimiter] = None
+    budget: Optional[ContextBudget] = None
+    # model tier per section type with fallback to faster tiers; `None` uses the default model
+    router: Optional[ModelRouter] = None
+    # generated LaTeX is checked against `latex_rules`; invalid sections are regenerated with the errors
+    latex_rules: Optional[LatexRules] = LatexRules()
+    max_repairs: int = 2
+    # scheduling hints: dynamic context types this node adapts, whether it is part of the body
+    # and whether it summarizes the body
+    adapts: list    = []
+    adapted         = None
+    paper           = None
+    body: bool      = True
+    needs_body: bool = False
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.auto_print   = False
         self.prompt       = 'Replace the % TODO: with your content and follow the task description below.'
 
     def forward(self, task, *args, **kwargs):
+        with self.metrics.span(self) as done:
+            res = self.generate(task, *args, **kwargs)
+            done(res)
+        return res
+
+    def generate(self, task, *args, **kwargs):
+        static, dynamic, task = self.prompt_context(task)
+        # routed before the cache key is built, so the key names the model that answers
+        tier = Context.router.route(type(self).__name__) if Context.router is not None else None
+        if tier is not None:
+            kwargs = {**kwargs, **Context.router.kwargs(tier)}
+        post_processors = [StripPostProcessor(), CodeExtractPostProcessor()]
         function = Function(self.prompt,
-                            post_processors=[StripPostProcessor(), CodeExtractPostProcessor()],
-                            static_context=self.static_context,
-                            dynamic_context=self.dynamic_context)
-        return function(task, *args, **kwargs)
+                            post_processors=post_processors,
+                            static_context=static,
+                            dynamic_context=dynamic)
+        computed = []
+        invalid  = []
+        # models that answered; a retry may fall back to another tier than the one named by the key
+        answered = []
+        def attempt(task, **model):
+            answered.append(model.get('model', kwargs.get('model')))
+            return function(task, *args, **{**kwargs, **model})
+        def call(task):
+            prompt_tokens = count_tokens(static + dynamic + str(task))
+            res = Context.invoke(lambda **model: attempt(task, **model), tokens=prompt_tokens, node=self,
+                                 section=type(self).__name__ if tier is not None else None)
+            completion_tokens = count_tokens(str(res))
+            if self.paper is not None:
+                self.paper.track(prompt_tokens, completion_tokens)
+            self.metrics.add(self, calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            return res
+        def complete():
+            computed.append(True)
+            res = call(task)
+            if self.latex_rules is None:
+                return res
+            # regenerate only this section, with the validation errors fed back; headings are checked
+            # against those of the sections generated so far
+            existing = self.paper.headings_of_others(self) if self.paper is not None else set()
+            errors   = validate_latex(str(res), self.latex_rules, existing)
+            for _ in range(Context.max_repairs):
+                if not errors:
+                    break
+                self.metrics.add(self, repairs=1)
+                res    = call(self.repair_task(task, res, errors))
+                errors = validate_latex(str(res), self.latex_rules, existing)
+            if errors:
+                self.metrics.add(self, invalid=1)
+                invalid.append(errors)
+            return res
+        def emitted(res):
+            if self.paper is not None and self.latex_rules is not None:
+                self.paper.add_headings(self, str(res))
+            return res
+        if Context.cache is None:
+            return emitted(complete())
+        # content address of everything that determines the completion
+        key = ResponseCache.key(self.prompt,
+                                static,
+                                dynamic,
+                                str(task),
+                                [str(arg) for arg in args],
+                                {k: str(v) for k, v in kwargs.items() if k != 'model'},
+                                self.model_name(**kwargs),
+                                [type(pp).__name__ for pp in post_processors])
+        # a section still failing validation after its repairs is not cached; the next build retries it.
+        # neither is a completion from a fallback tier, which the key does not name
+        cacheable = lambda value: not invalid and all(model == kwargs.get('model') for model in answered)
+        res = emitted(Context.cache(key, complete, section=type(self).__name__, cacheable=cacheable))
+        self.metrics.add(self, cache_hits=0 if computed else 1, cache_misses=1 if computed else 0)
+        return Symbol(res)
+
+    @staticmethod
+    def repair_task(task, res, errors: list) -> Symbol:
+        feedback = '\n'.join(f"- {error}" for error in errors)
+        return Symbol(f"{task}\n\n[Previous Output]\n{res}\n\n[Validation Errors]\n"
+                      f"The previous output violates the format rules. Rewrite it and fix the following problems:\n{feedback}")
+
+    def prompt_context(self, task) -> tuple:
+        # the static context leads and adapted contexts follow in a stable order, so that prompts
+        # share a cacheable prefix; `Context.budget` compresses them to the section's budget
+        static  = self.static_context
+        adapted = self.dynamic_entries()
+        entries = [entry for _, entry in adapted]
+        if Context.budget is None:
+            return static, self.join_dynamic(entries), task
+        value   = getattr(task, 'value', task)
+        items   = [str(t) for t in value] if isinstance(value, list) else [str(task)]
+        entries, fitted = Context.budget.fit(type(self).__name__, static, entries, items,
+                                             sources=[source for source, _ in adapted])
+        if fitted != items:
+            task = Symbol(fitted) if isinstance(value, list) else Symbol(fitted[0])
+        return static, self.join_dynamic(entries), task
+
+    @staticmethod
+    def invoke(call, tokens: int = 0, node=None, section: Optional[str] = None):
+        # throttle against the shared rate limiter and back off on 429 responses; limiter waits and
+        # retries are attributed to `node`. With a router, `section` is routed again on every attempt,
+        # so that the retry after a rate limit goes to the fallback tier, and `call(**model)` receives
+        # the model arguments of the tier
+        metrics = node.metrics if node is not None else RunMetrics()
+        router  = Context.router if section is not None else None
+        tiers   = []
+        def limited():
+            tier = router.route(section) if router is not None else None
+            tiers.append(tier)
+            if Context.limiter is not None:
+                waited = Context.limiter.acquire(tokens)
+                metrics.add(node, queue_s=waited)
+                if tier is not None:
+                    router.waited(tier, waited)
+            if tier is None:
+                return call()
+            start = time.monotonic()
+            res   = call(**router.kwargs(tier))
+            router.record(tier, section, time.monotonic() - start, tokens, count_tokens(str(res)))
+            return res
+        def on_retry(attempt, e):
+            metrics.add(node, retries=1)
+            if tiers and tiers[-1] is not None:
+                router.rate_limited(tiers[-1])
+        return retry(limited, on_retry=on_retry)
+
+    @property
+    def metrics(self) -> RunMetrics:
+        # unbound nodes record into a throwaway collector
+        return self.paper.metrics if self.paper is not None else RunMetrics()
+
+    @property
+    def children(self) -> list:
+        return []
+
+    def inputs(self) -> list:
+        # everything a build of this node depends on, used for incremental rebuilds
+        return [type(self).__name__, self.prompt, self.static_context, self.model_name(), self.settings(),
+                [child.inputs() for child in self.children]]
+
+    def settings(self) -> list:
+        # run configuration that shapes this node's prompt or completion
+        name     = type(self).__name__
+        budget   = [Context.budget.limit(name), Context.budget.priorities] if Context.budget is not None else None
+        model    = Context.router.tier(name).model if Context.router is not None else None
+        repairs  = Context.max_repairs if self.latex_rules is not None else None
+        # sections prompting with chunks retrieved from their source
+        source   = getattr(self, 'source', None)
+        retrieve = [Source.top_k, Source.token_budget] if isinstance(source, Source) else None
+        return [budget, model, repairs, retrieve]
+
+    @staticmethod
+    def model_name(**kwargs) -> Optional[str]:
+        if 'model' in kwargs:
+            return kwargs['model']
+        return settings.SYMAI_CONFIG.get('NEUROSYMBOLIC_ENGINE_MODEL')
 
     @property
     def description(self):
@@ -92,61 +434,216 @@ class Context(Conversation):
 
     @property
     def static_context(self):
-        assert Paper.context is not None, "The global context is not set."
-        return PAPER_STATIC_CONTEXT.format(context=Paper.context, description=self.description)
+        context = self.paper.context if self.paper is not None else Paper.context
+        assert context is not None, "The global context is not set."
+        return PAPER_STATIC_CONTEXT.format(context=context, description=self.description)
+
+    @property
+    def dynamic_context(self) -> str:
+        return self.join_dynamic([entry for _, entry in self.dynamic_entries()])
+
+    def dynamic_entries(self) -> list:
+        # `(adapting section type, context)` pairs
+        if self.paper is None:
+            val = str(super().dynamic_context).strip()
+            return [(None, val)] if val else []
+        # sorted instead of arrival order, which varies between concurrent runs
+        return sorted(self.paper.dynamic_for(self), key=lambda entry: (entry[1], entry[0] or ''))
+
+    @staticmethod
+    def join_dynamic(entries: list) -> str:
+        val = '\n'.join(entries)
+        return f'\n{val}' if val else ''
+
+    def share(self, context):
+        # update the dynamic context of the adapted types, scoped to the paper when bound to one
+        if self.paper is not None:
+            self.paper.adapt_context(context, self.adapts, source=type(self).__name__)
+        else:
+            self.adapt(context=context, types=self.adapts)
+
+
+class lazy_resource:
+    # class-level resource created on first access instead of at import time
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self.value   = None
+        self.lock    = threading.Lock()
+
+    def __get__(self, instance, owner):
+        if self.value is None:
+            with self.lock:
+                if self.value is None:
+                    self.value = self.factory()
+        return self.value
+
+
+def digest(content) -> str:
+    return hashlib.sha256(str(content).encode('utf-8')).hexdigest()
 
 
 class Source(Context):
-    bib_parser = BibTexParser()
-    reader     = FileReader()
-    bib_references = [line for line in reader(DEFAULT_BIB_PATH) / '\n\n' if line]
+    bib_parser = lazy_resource(BibTexParser)
+    reader     = lazy_resource(FileReader)
+    # file reads and bibliography parses at construction, before the node is bound to a paper;
+    # reads are keyed by path and file stamp, so that edits are read again by a long-lived process,
+    # parses by content hash; holding only blob ids and parsed entries
+    loads      = RunMemo()
+    # summaries condition other sections and never reach the document
+    latex_rules      = None
+    # retrieval of the most relevant chunks per section; `token_budget = None` sends whole sources
+    top_k            = 8
+    token_budget: Optional[int] = 3000
+    retrieval_report = {}
+    # paper texts shared by all sources of the process, referenced by content hash
+    blobs            = lazy_resource(BlobStore)
+    # URL sources are fetched concurrently in the ingestion pool
+    ingest           = lazy_resource(lambda: Ingestor(readers={'application/pdf': lambda path: str(Source.reader(path))}))
+    document_id      = None
+    document_path    = None
+    blob_record      = None
+    pending          = None
+    # bibliography parses of file and URL sources are model calls and deferred to first use,
+    # so that planning an incremental build makes none
+    pending_bib      = None
+    _resolve_lock    = threading.Lock()
 
     def __init__(self,
                  bib_link: Optional[str] = None,
                  file_link: Optional[str] = None,
                  url_link: Optional[str] = None,
                  bib_path: str = DEFAULT_BIB_PATH,
+                 papers_dir: str = DEFAULT_PAPERS_DIR,
                  **kwargs):
+        # `store_file` runs during `Conversation.__init__` and needs the bibliography path
+        self.bib_path   = bib_path
+        self.papers_dir = papers_dir
         super().__init__(file_link=file_link, url_link=url_link, **kwargs)
-        self.bib_link  = bib_link
-        self.bib_path  = bib_path
+        self.bib_link   = bib_link
         if bib_link is not None:
             self.store_bib(bib_ref=bib_link)
 
     def forward(self, task, *args, **kwargs):
+        self.resolve()
         assert self.bib_value is not None, f"Reference not set for bib_value: {self.bib_value}."
-        res = super().forward(task,
-                              payload="ONLY EXCEPTION CASE - use this citation for the summary: \citep{" + str(self.bib_value) + "}",
-                              *args, **kwargs)
+        # identical nodes (same type, reference, content and context) share one computation
+        key = (type(self).__name__,
+               self.bib_link or str(self.file_link or self.url_link),
+               self.content_hash,
+               digest(self.static_context + str(self.dynamic_context) + str(task)))
+        payload = "ONLY EXCEPTION CASE - use this citation for the summary: \citep{" + str(self.bib_value) + "}"
+        res = self.memo(key, lambda: super(Source, self).forward(task, payload=payload, *args, **kwargs))
         return res
 
+    @property
+    def memo(self) -> RunMemo:
+        # unbound nodes compute on their own
+        return self.paper.memo if self.paper is not None else RunMemo()
+
     def store_bib(self, bib_ref: str, *args, **kwargs):
         # get exact matching bib_ref from references
-        ref     = [ref for ref in Source.bib_references if bib_ref in ref]
-        assert len(ref) == 1, f"Reference {bib_ref} not found in {self.bib_path}."
-        paper   = (Path(__file__).parent.absolute() / "documents" / "bib" / "related_work" / f"{bib_ref}.txt").as_posix()
-        content = self.reader(paper)
-        val     = Symbol(f"[PAPER::{bib_ref}]: <<<\n{str(content)}\n>>>\n") | f"[BIBLIOGRAPHY::{bib_ref}]: <<<\n{str(ref[0])}\n>>>\n"
-        self.store(str(val))
-        self.bib_value = bib_ref
+        ref     = Bibliography.load(self.bib_path).get(bib_ref)
+        assert ref is not None, f"Reference {bib_ref} not found in {self.bib_path}."
+        paper   = (Path(self.papers_dir) / f"{bib_ref}.txt").as_posix()
+        blob    = Source.loads(('read', paper, stamp(paper)), lambda: Source.blobs.put(str(self.reader(paper))))
+        self.content_hash = blob
+        self.bib_value    = bib_ref
+        self.keep_document(blob, bib_ref, ref, paper)
 
     def store_file(self, file_path: str, *args, **kwargs):
-        content  = self.reader(file_path)
-        bib      = Source.bib_parser(content).split(',')
-        bib_ref  = bib[0].split('{')[-1]
-        Source.bib_references.append(','.join(bib))
-        val      = Symbol(f"[PAPER::{bib_ref}]: <<<\n{str(content)}\n>>>\n") | f"[BIBLIOGRAPHY::{bib_ref}]: <<<\n{str(bib)}\n>>>\n"
-        self.store(str(val))
-        self.bib_value = bib_ref
+        blob     = Source.loads(('read', file_path, stamp(file_path)), lambda: Source.blobs.put(str(self.reader(file_path))))
+        self.content_hash  = blob
+        self.document_path = file_path
+        self.pending_bib   = lambda: Source.loads(('bib', blob), lambda: self.parse_bib(Source.blobs.get(blob), self.bib_path))
 
     def store_url(self, url: str, *args, **kwargs):
-        content  = self.crawler(url)
-        bib      = Source.bib_parser(url | content).split(',')
-        bib_ref  = bib[0].split('{')[-1]
-        Source.bib_references.append(','.join(bib))
-        val      = Symbol(f"[PAPER::{bib_ref}]: <<<\n{str(content)}\n>>>\n") | f"[BIBLIOGRAPHY::{bib_ref}]: <<<\n{str(bib)}\n>>>\n"
-        self.store(str(val))
-        self.bib_value = bib_ref
+        # construction only schedules the download; the source resolves on first use
+        self.pending = (url, Source.ingest.submit(url))
+
+    def fetch(self):
+        # waits for a scheduled download; makes no model calls
+        pending = self.pending
+        if pending is None:
+            return
+        url, future = pending
+        text, _     = future.result()
+        with Source._resolve_lock:
+            if self.pending is None:
+                return
+            blob  = Source.blobs.put(text)
+            parse = lambda content: self.parse_bib(url | Symbol(content), self.bib_path)
+            self.content_hash = blob
+            self.pending_bib  = lambda: Source.loads(('bib', blob), lambda: Source.ingest.bibtex(url, text, parse))
+            self.pending      = None
+
+    def resolve(self):
+        self.fetch()
+        parse = self.pending_bib
+        if parse is None:
+            return
+        # parsed outside the lock; concurrent callers share the parse through `Source.loads`
+        bib = parse()
+        with Source._resolve_lock:
+            if self.pending_bib is None:
+                return
+            bib_ref  = bib[0].split('{')[-1]
+            self.bib_value = bib_ref
+            self.keep_document(self.content_hash, bib_ref, bib, self.document_path)
+            self.pending_bib = None
+
+    def inputs(self) -> list:
+        # the content hash determines the parsed bibliography, which is left to the build
+        self.fetch()
+        return super().inputs() + [self.bib_link or str(self.file_link or self.url_link), self.content_hash]
+
+    def keep_document(self, blob: str, bib_ref: str, bib, path: Optional[str]):
+        # the memory references the shared blob instead of holding its own copy of the paper
+        self.document_id   = blob
+        self.document_bib  = str(bib)
+        self.document_path = path
+        self.blob_record   = BlobText(Source.blobs, [f"[PAPER::{bib_ref}]: <<<\n", (blob,),
+                                                     f"\n>>>\n[BIBLIOGRAPHY::{bib_ref}]: <<<\n{self.document_bib}\n>>>\n"])
+
+    @property
+    def document(self) -> Optional[str]:
+        return Source.blobs.get(self.document_id) if self.document_id is not None else None
+
+    def history(self) -> list:
+        self.resolve()
+        return [self.blob_record] if self.blob_record is not None else super().history()
+
+    def context_for(self, query: str, section: str) -> str:
+        # top-k chunks of the source relevant to `query` instead of the whole file
+        self.resolve()
+        if Source.token_budget is None or self.document_id is None:
+            # joined once from the blob record instead of through the repr of `history()`
+            return str(self.blob_record) if self.blob_record is not None else f"{self.history()}"
+        indexes  = self.paper.indexes if self.paper is not None else RunMemo()
+        index    = indexes(('index', self.content_hash),
+                               lambda: LexicalIndex.load_or_build(self.document, self.document_path))
+        chunks   = index.select(query, top_k=Source.top_k, token_budget=Source.token_budget)
+        selected = f"[PAPER::{self.bib_value}]: <<<\n" + "\n[...]\n".join(chunks) + f"\n>>>\n[BIBLIOGRAPHY::{self.bib_value}]: <<<\n{self.document_bib}\n>>>\n"
+        # the size of the full record is known without joining it
+        full     = count_tokens(self.blob_record) if self.blob_record is not None else 0
+        Source.retrieval_report[section] = {
+            "source_tokens": full,
+            "prompt_tokens": count_tokens(selected),
+            "saved_tokens": full - count_tokens(selected),
+        }
+        return selected
+
+    @staticmethod
+    def parse_bib(content, bib_path: str = DEFAULT_BIB_PATH) -> list:
+        # a model call over the whole source; cached like every section completion
+        parse = lambda: str(Context.invoke(lambda: Source.bib_parser(content), tokens=len(str(content)) // 4))
+        if Context.cache is None:
+            bib = parse()
+        else:
+            key = ResponseCache.key('BibTexParser', str(content), Context.model_name())
+            bib = Context.cache(key, parse, section='BibTexParser')
+        bib = bib.split(',')
+        Bibliography.load(bib_path).add(bib[0].split('{')[-1], ','.join(bib))
+        return bib
 
     @property
     def description(self):
@@ -158,6 +655,32 @@ Do NOT create any sections or subsections. Only write one coherent text about th
 
 
 class Cite(Source):
+    # precomputed paper-independent summaries (summaries.py); a hit skips the model call and the
+    # section prompt adapts the base summary to the paper
+    summaries: Optional[SummaryIndex] = None
+
+    def forward(self, task, *args, **kwargs):
+        base = self.base_summary()
+        if base is None:
+            return super().forward(task, *args, **kwargs)
+        self.metrics.add(self, precomputed=1)
+        return Symbol(self.adapt_summary(base))
+
+    def base_summary(self) -> Optional[str]:
+        # the index covers the papers of `papers_dir`, which are cited by their bib key
+        if Cite.summaries is None or self.bib_link is None:
+            return None
+        return Cite.summaries.get(self.bib_link, self.content_hash)
+
+    def adapt_summary(self, base: str) -> str:
+        # the summary must carry its citation whatever the precompute model produced
+        citation = "\\citep{" + str(self.bib_value) + "}"
+        return base if citation in base else f"{base.rstrip()} {citation}"
+
+    def inputs(self) -> list:
+        base = self.base_summary()
+        return super().inputs() + ([digest(base)] if base is not None else [])
+
     @property
     def description(self):
         return f"""[Task]
@@ -165,15 +688,63 @@ Write a short two sentence related work summary in the context of the paper. Do
 """
 
 
+class CitationSummary(Context):
+    # base summary of one cited paper, independent of the paper citing it
+    latex_rules = None
+    body        = False
+
+    @property
+    def static_context(self):
+        return f"""[General Context]
+You summarize scientific papers for a corpus of related work that is reused across many papers.
+
+{self.description}"""
+
+    @property
+    def description(self):
+        return f"""[Task]
+Summarize the provided paper in three sentences: the problem it addresses, its method and its main results.
+Do NOT create any sections or subsections. End the summary with the citation `\\citep{{KEY}}`, where KEY is the bibliography key of the paper.
+{DO_NOT_CHANGE_CITATIONS}
+"""
+
+
 class Image(Expression):
+    body    = False
+    figures = lazy_resource(FigureStore)
+    # rasterized figure path, resolved once per node instead of hashing the PDF on every prompt
+    raster  = None
+
     def __init__(self, file_link, **kwargs):
         super().__init__(**kwargs)
         self.file_link = file_link
 
+    @property
+    def pdf(self) -> str:
+        return f"{self.file_link}.pdf"
+
+    @property
+    def image(self) -> str:
+        # unique per PDF content, so concurrent figures never overwrite each other
+        if not Path(self.pdf).exists():
+            return self.pdf
+        if self.raster is None:
+            self.raster = Image.figures.target(self.pdf).as_posix()
+        return self.raster
+
+    def inputs(self) -> list:
+        model = Context.router.tier(type(self).__name__).model if Context.router is not None else 'gpt-4-vision-preview'
+        return [type(self).__name__, self.file_link, self.description, model]
+
+    def prefetch(self):
+        if Path(self.pdf).exists():
+            Image.figures.submit(self.pdf)
+
     def forward(self, task, **kwargs):
-        pages = convert_from_path(f"{self.file_link}.pdf", 500)
-        pages[0].save(f'tmp/image_out.jpg', 'JPEG')
-        res = Expression.prompt(self.description, model='gpt-4-vision-preview', **kwargs)
+        Image.figures(self.pdf)
+        routed = type(self).__name__ if Context.router is not None else None
+        res    = Context.invoke(lambda **model: Expression.prompt(self.description, **{**kwargs, 'model': 'gpt-4-vision-preview', **model}),
+                                tokens=count_tokens(self.description), section=routed)
         template = f"""\\begin{{figure}}[h!]
     \\centering
     \\includegraphics[width=1.0\\linewidth]{{/Users/xpitfire/.symai/packages/ExtensityAI/docmatic/src/documents/method/{self.file_link}}}
@@ -193,7 +764,7 @@ Only return the text of the caption. Do not return the tags `\\caption` or any o
 {DO_NOT_CHANGE_CITATIONS}
 {DO_NOT_ADD_ALGORITHMS}
 
-'<<vision:image_out.jpg:>>'
+'<<vision:{self.image}:>>'
 """
 
 
@@ -201,12 +772,18 @@ class Method(Context):
     def __init__(self, source, **kwargs):
         super().__init__(**kwargs)
         self.source = source
+        self.adapts = [RelatedWork, Abstract, Title, Introduction, Cite, Implementation]
+
+    @property
+    def children(self) -> list:
+        return [self.source]
 
     def forward(self, task, **kwargs):
         summary = self.source(task, **kwargs)
         # update the dynamic context globally for all types
-        self.adapt(context=summary, types=[RelatedWork, Abstract, Title, Introduction, Cite, Implementation])
-        return super().forward(task | f"[Source]\n{self.source.history()}", **kwargs)
+        self.adapted = str(summary)
+        self.share(summary)
+        return super().forward(task | f"[Source]\n{self.source.context_for(self.description, type(self).__name__)}", **kwargs)
 
     @property
     def description(self):
@@ -220,12 +797,18 @@ Also use greek letters for mathematical symbols and best practice notation for m
 
 
 class Algorithm(Context):
+    latex_rules = LatexRules(commands={'caption', 'label'}, environments={'algorithm'})
+
     def __init__(self, source, **kwargs):
         super().__init__(**kwargs)
         self.source = source
 
+    @property
+    def children(self) -> list:
+        return [self.source]
+
     def forward(self, task, **kwargs):
-        return super().forward(task | f"[Source]\n{self.source.history()}", **kwargs)
+        return super().forward(task | f"[Source]\n{self.source.context_for(self.description, type(self).__name__)}", **kwargs)
 
     @property
     def description(self):
@@ -239,12 +822,18 @@ When adding algorithms also add explanations and descriptions of the algorithm s
 
 
 class Implementation(Context):
+    latex_rules = LatexRules(commands={'caption', 'label'})
+
     def __init__(self, source, **kwargs):
         super().__init__(**kwargs)
         self.source = source
 
+    @property
+    def children(self) -> list:
+        return [self.source]
+
     def forward(self, task, **kwargs):
-        return super().forward(task | f"[Source]\n{self.source.history()}", **kwargs)
+        return super().forward(task | f"[Source]\n{self.source.context_for(self.description, type(self).__name__)}", **kwargs)
 
     @property
     def description(self):
@@ -258,6 +847,9 @@ Only use `lstlisting` for code snippets if addressing the implementation section
 
 
 class Conclusion(Context):
+    body       = False
+    needs_body = True
+
     def forward(self, task, **kwargs):
         return super().forward(task, **kwargs)
 
@@ -271,11 +863,21 @@ Your goal is to write the conclusion section which summarizes the main findings
 
 
 class Appendix(Context):
+    body = False
+
     def __init__(self, *sections, **kwargs):
         super().__init__(**kwargs)
         for task in sections:
             task.metadata.detach = True
-        self.sections   = Parallel(*sections, sequential=True)
+        self.sections   = Concurrent(*sections)
+
+    @property
+    def children(self) -> list:
+        return list(self.sections.expr)
+
+    def inputs(self) -> list:
+        # the appendix has no prompt of its own
+        return [type(self).__name__, [child.inputs() for child in self.children]]
 
     def forward(self, task, **kwargs):
         # update the dynamic context globally for all types
@@ -286,7 +888,11 @@ class Appendix(Context):
 class RelatedWork(Context):
     def __init__(self, *citations, **kwargs):
         super().__init__(**kwargs)
-        self.citations = Parallel(*citations, sequential=True) # to avoid API rate limits process parallel citations sequentially
+        self.citations = Concurrent(*citations) # API rate limits are enforced by the shared `Context.limiter`
+
+    @property
+    def children(self) -> list:
+        return list(self.citations.expr)
 
     def forward(self, task, **kwargs):
         # execute the parallel tasks
@@ -306,7 +912,11 @@ Do not create repetitive paragraphs.
 class Introduction(Context):
     def __init__(self, *citations, **kwargs):
         super().__init__(**kwargs)
-        self.citations = Parallel(*citations, sequential=True)
+        self.citations = Concurrent(*citations)
+
+    @property
+    def children(self) -> list:
+        return list(self.citations.expr)
 
     def forward(self, task, **kwargs):
         # execute the parallel tasks
@@ -324,6 +934,10 @@ Do not add any subsections or paragraph tags. Write multiple content text blocks
 
 
 class Abstract(Context):
+    body        = False
+    needs_body  = True
+    latex_rules = LatexRules(environments={'abstract'})
+
     @property
     def description(self):
         return f"""[Task]
@@ -342,6 +956,10 @@ Do not add a new line to split the text into paragraphs or any other commands in
 
 
 class Title(Context):
+    body        = False
+    needs_body  = True
+    latex_rules = LatexRules(commands={'title'})
+
     @property
     def description(self):
         return f"""[Task]
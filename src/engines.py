@@ -0,0 +1,133 @@
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from symai import Engine, EngineRepository
+
+
+class ReplayEngine(Engine):
+    # offline stand-in for the neurosymbolic engine; replays recorded completions in order
+    def __init__(self, completions: Union[str, List[str]], latency: float = 0.0):
+        super().__init__()
+        if isinstance(completions, str):
+            completions = json.loads(Path(completions).read_text())
+        assert len(completions) > 0, "At least one recorded completion is required."
+        self.completions = completions
+        self.latency     = latency
+        self.calls       = 0
+        self.prompts     = []
+        self._lock       = threading.Lock()
+
+    def id(self) -> str:
+        return 'neurosymbolic'
+
+    def install(self) -> 'ReplayEngine':
+        EngineRepository.register(self.id(), self, allow_engine_override=True)
+        return self
+
+    def prepare(self, argument):
+        ref = argument.prop.instance
+        static_ctxt, dyn_ctxt = ref.global_context
+        argument.prop.prepared_input = "\n".join([str(static_ctxt), str(dyn_ctxt),
+                                                  str(argument.prop.payload or ''),
+                                                  str(argument.prop.prompt or ''),
+                                                  str(argument.prop.processed_input)])
+
+    def forward(self, argument):
+        with self._lock:
+            rsp         = self.completions[self.calls % len(self.completions)]
+            self.calls += 1
+            self.prompts.append(argument.prop.prepared_input)
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return [rsp], {}
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class SyntheticEngine(Engine):
+    # offline benchmark engine: fixed latency plus completion time at `tokens_per_second`,
+    # and a share of requests rejected with 429 to exercise retries
+    def __init__(self,
+                 latency: float = 0.0,
+                 tokens_per_second: Optional[float] = None,
+                 completion_tokens: int = 200,
+                 failure_rate: float = 0.0,
+                 citations: Optional[List[str]] = None,
+                 seed: int = 0):
+        super().__init__()
+        self.latency           = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.failure_rate      = failure_rate
+        self.citations         = citations or []
+        self.calls             = 0
+        self.failures          = 0
+        self._random           = random.Random(seed)
+        self._lock             = threading.Lock()
+
+    def id(self) -> str:
+        return 'neurosymbolic'
+
+    def install(self) -> 'SyntheticEngine':
+        EngineRepository.register(self.id(), self, allow_engine_override=True)
+        return self
+
+    prepare = ReplayEngine.prepare
+
+    def completion(self, n: int, prompt: str, tokens: int) -> str:
+        if 'bibtex' in prompt.lower():
+            return f"@article{{Synthetic:{n}, title={{Synthetic source {n}}}, author={{A. Author}}, year={{2024}}}}"
+        words = [f"token{i % 97}" for i in range(tokens)]
+        cites = [f"\\citep{{{self.citations[(n + i) % len(self.citations)]}}}" for i in range(3)] if self.citations else []
+        return "```latex\n" + " ".join(words + cites) + "\n```"
+
+    def forward(self, argument):
+        with self._lock:
+            n           = self.calls
+            self.calls += 1
+            failed      = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if failed:
+            raise RateLimitError("429: synthetic rate limit")
+        # routed calls cap the completion length
+        tokens = min(self.completion_tokens, argument.kwargs.get('max_tokens') or self.completion_tokens)
+        if self.tokens_per_second:
+            time.sleep(tokens / self.tokens_per_second)
+        return [self.completion(n, str(argument.prop.prepared_input), tokens)], {}
+
+
+class RoutedEngine(Engine):
+    # dispatches on the requested model, e.g. to SyntheticEngines with different latency profiles
+    # standing in for the tiers of a `ModelRouter`
+    def __init__(self, engines: Dict[str, Engine], default: Optional[str] = None):
+        super().__init__()
+        assert default is None or default in engines, f"Unknown default model {default}."
+        self.engines = engines
+        self.default = default
+        self.calls   = {model: 0 for model in engines}
+        self._lock   = threading.Lock()
+
+    def id(self) -> str:
+        return 'neurosymbolic'
+
+    def install(self) -> 'RoutedEngine':
+        EngineRepository.register(self.id(), self, allow_engine_override=True)
+        return self
+
+    prepare = ReplayEngine.prepare
+
+    def forward(self, argument):
+        model = argument.kwargs.get('model') or self.default
+        assert model in self.engines, f"No engine for model {model}."
+        with self._lock:
+            self.calls[model] += 1
+        return self.engines[model].forward(argument)
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+
+DEFAULT_FIGURE_DIR = (Path(__file__).parent.absolute() / "tmp" / "cache" / "figures").as_posix()
+# longest image side accepted by the vision model without downscaling on the server
+MAX_SIDE           = 2048
+# resolution of the previous full rasterization; figures smaller than `MAX_SIDE` at this
+# resolution keep their size instead of being upscaled
+DPI                = 500
+SIZE_PATTERN       = re.compile(r"([\d.]+)\s*x\s*([\d.]+)")
+
+
+def pdf_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FigureStore:
+    # first-page rasterizations of PDF figures, cached by content hash and produced in a worker pool
+    def __init__(self, path: str = DEFAULT_FIGURE_DIR, max_side: int = MAX_SIDE, dpi: int = DPI, max_workers: int = 4):
+        self.path        = Path(path)
+        self.max_side    = max_side
+        self.dpi         = dpi
+        self.max_workers = max_workers
+        self.hits        = 0
+        self.misses      = 0
+        self._futures: Dict[str, Future] = {}
+        self._lock       = threading.Lock()
+        self._pool       = None
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        # rasterization runs in pdftoppm subprocesses, threads only wait on them
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def target(self, pdf: str) -> Path:
+        return self.path / f"{pdf_hash(Path(pdf))}-{self.max_side}-{self.dpi}.jpg"
+
+    def rasterize(self, pdf: str) -> str:
+        target = self.target(pdf)
+        if target.exists():
+            with self._lock:
+                self.hits += 1
+            return target.as_posix()
+        with self._lock:
+            self.misses += 1
+        from pdf2image import convert_from_path
+        self.path.mkdir(parents=True, exist_ok=True)
+        # min(native, max_side): large pages are scaled down to `max_side`, small ones keep `dpi`
+        scale = {'size': self.max_side} if self.native_side(pdf) > self.max_side else {'dpi': self.dpi}
+        with tempfile.TemporaryDirectory(dir=self.path) as tmp:
+            # only the first page, written by pdftoppm directly
+            paths = convert_from_path(pdf, first_page=1, last_page=1, fmt='jpeg', output_folder=tmp,
+                                      output_file='page', single_file=True, paths_only=True, **scale)
+            os.replace(paths[0], target)
+        return target.as_posix()
+
+    def native_side(self, pdf: str) -> float:
+        # longest side of the first page in pixels at `dpi`; pdfinfo reports the size in points
+        from pdf2image import pdfinfo_from_path
+        width, height = SIZE_PATTERN.match(pdfinfo_from_path(pdf)['Page size']).groups()
+        return max(float(width), float(height)) / 72 * self.dpi
+
+    def submit(self, pdf: str) -> Future:
+        # one rasterization per PDF path, shared by all nodes asking for it
+        with self._lock:
+            future = self._futures.get(pdf)
+        if future is None:
+            future = self.pool.submit(self.rasterize, pdf)
+            with self._lock:
+                future = self._futures.setdefault(pdf, future)
+        return future
+
+    def __call__(self, pdf: str) -> str:
+        return self.submit(pdf).result()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,25 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Tuple, Union
+
+
+def write_atomic(path: Union[str, Path], data: Union[str, bytes]):
+    # readers see the old or the new file, never a partial one; the temporary file is unique per
+    # call, so concurrent writers of the same path never replace each other's temporary file
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as file:
+            file.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def stamp(path: Union[str, Path]) -> Tuple[int, int]:
+    # modification time and size; changes whenever the file is rewritten
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
@@ -1,13 +1,22 @@
-import os
-import re
+import argparse
 from pathlib import Path
 
 from beartype import beartype
-from beartype.typing import Dict
+from beartype.typing import Dict, Iterator, List, Optional
 from symai import Symbol, Expression
-from symai.components import Trace, GraphViz
 
-from components import (Abstract, Cite, Introduction, Method, Implementation, Algorithm, Paper,
+from bibliography import Bibliography
+from budget import ContextBudget
+from cache import DEFAULT_CACHE_PATH, ResponseCache
+from files import write_atomic
+from latex import CompileResult, DraftWatcher, LatexCompiler
+from manifest import DEFAULT_MANIFEST_PATH, BuildManifest
+from metrics import DEFAULT_METRICS_PATH
+from render import RenderPlan, prune_citations
+from routing import DEFAULT_ROUTES, ModelRouter
+from scheduler import RateLimiter, Scheduler
+from summaries import DEFAULT_SUMMARY_PATH, SummaryIndex
+from components import (Abstract, Cite, Context, Introduction, Method, Implementation, Algorithm, Paper,
                         RelatedWork, Source, Title, Appendix, Image)
 
 
@@ -30,24 +39,43 @@ class DocumentGenerator(Expression):
 
         return document
 
+    @staticmethod
+    def placeholder(node: Expression) -> str:
+        # stand-in for sections that are still being generated
+        if isinstance(node, Title):
+            return "\\title{Draft}"
+        if isinstance(node, Abstract):
+            return "\\begin{abstract}\n\\textit{Generating\\ldots}\n\\end{abstract}"
+        return f"\\section{{{type(node).__name__}}}\n\\textit{{Generating\\ldots}}"
+
+    def stream(
+        self,
+        task: Symbol,
+        paper: Expression,
+        document_name: str,
+        template_dir: Path,
+        author: str,
+        watcher: Optional[DraftWatcher] = None,
+        **kwargs
+    ) -> Iterator[tuple]:
+        # rewrite the document with placeholders after every completed section;
+        # yields `(node_id, content)` and leaves the final document on disk
+        for node_id, results in paper.stream(task, **kwargs):
+            content = {"author": author, **paper.assemble(results, self.placeholder).value}
+            self.write_document(document_name, template_dir, content)
+            if watcher is not None:
+                watcher.notify()
+            yield node_id, content
+
     @beartype
     @staticmethod
     def compile_document(
         document_name: str,
-        template_dir: Path
-    ):
-
-        os.environ['TEXINPUTS'] = f"{template_dir}:{os.environ.get('TEXINPUTS', '')}"
-        os.environ["openout_any"] = "a"
-        os.chdir(template_dir)
-
-        os.system(f"lualatex --interaction=batchmode --output-directory={template_dir} {template_dir / document_name}.tex")
-        os.system(f"bibtex {template_dir / document_name}")
-        os.system(f"lualatex --interaction=batchmode --output-directory={template_dir} {template_dir / document_name}.tex")
-        os.system(f"lualatex --interaction=batchmode --output-directory={template_dir} {template_dir / document_name}.tex")
-
-        del os.environ['TEXINPUTS']
-        del os.environ["openout_any"]
+        template_dir: Path,
+        compiler: Optional[LatexCompiler] = None
+    ) -> CompileResult:
+        compiler = compiler if compiler is not None else LatexCompiler()
+        return compiler(document_name, template_dir)
 
     @beartype
     @staticmethod
@@ -55,28 +83,18 @@ class DocumentGenerator(Expression):
         document_name: str,
         template_dir: Path,
         content: Dict,
-    ):
-        # load the template
-        with open(f"{template_dir / document_name}.tex.template", "r") as file:
-            template = file.read()
-        # replace the content
-        for key, value in content.items():
-            template = template.replace(f"%TODO{{{key}}}", value)
-
-        # filter out invalid citations
-        # 1. load citations file
-        with open(f"{template_dir / 'references'}.bib", "r") as file:
-            citations = file.read()
-        # 2. regex to find all \citep{...} entries in the template
-        cites = set(re.findall(r"\\citep{.*?}", template))
-        # 3. filter out the invalid citations
-        for cite in cites:
-            if cite[7:-1] not in citations:
-                template = template.replace(cite, "")
+    ) -> List[str]:
+        # fill the pre-parsed template in one pass
+        plan     = RenderPlan.load(f"{template_dir / document_name}.tex.template")
+        document = plan.render(content)
 
-        # write the document
-        with open(f"{template_dir / document_name}.tex", "w") as file:
-            file.write(template)
+        # filter out invalid citations key by key against the exact keys of the bibliography
+        citations         = Bibliography.load(f"{template_dir / 'references'}.bib")
+        document, dropped = prune_citations(document, citations)
+
+        # write the document atomically so that concurrent compiles never read a partial file
+        write_atomic(f"{template_dir / document_name}.tex", document)
+        return dropped
 
 
 USER_SPECIFIC_CONTEXT = """[Global Context]
@@ -96,52 +114,163 @@ Consider:
 """
 
 
-if __name__ == "__main__":
-    dir_path     = Path(__file__).parent.absolute() / "documents"
-    template_dir = Path(__file__).parent.absolute() / "template"
-    task = Symbol("[Objective]\nWrite a paper about the SymbolicAI framework. Include citations and references from the referenced papers. Follow primarily the [Task] instructions.")
-    Paper.context = USER_SPECIFIC_CONTEXT
-    hierarchy = Trace(Paper(
+DOCUMENTS_DIR = Path(__file__).parent.absolute() / "documents"
+TEMPLATE_DIR  = Path(__file__).parent.absolute() / "template"
+
+
+DEFAULT_SPEC = {
+    "name": "symbolicai",
+    "context": USER_SPECIFIC_CONTEXT,
+    "task": "[Objective]\nWrite a paper about the SymbolicAI framework. Include citations and references from the referenced papers. Follow primarily the [Task] instructions.",
+    "author": r"\author{GPT4 Turbo, Claudiu Leoveanu-Condrei, Marius-Constantin Dinu}",
+    "source": "method/symbolicai_docs.txt",
+    "related_work": ["Newell:56", "Newell:57", "Laird:87", "Newell:72", "McCarthy:06", "Santoro:22"],
+    "introduction": ["Brown:20", "Santoro:22", "Ouyang:22", "Santoro:22", "Wei:22"],
+}
+
+
+def build_paper(spec: dict, **kwargs) -> Paper:
+    # paper hierarchy from a spec; relative source paths resolve against `documents/`
+    source = (DOCUMENTS_DIR / spec["source"]).as_posix()
+    return Paper(
         Algorithm(
-            Source(file_link=(dir_path / "method/symbolicai_docs.txt").as_posix()),
+            Source(file_link=source),
         ),
         Method(
-            Source(file_link=(dir_path / "method/symbolicai_docs.txt").as_posix()),
+            Source(file_link=source),
         ),
         RelatedWork(
-            Cite(bib_link='Newell:56'),
-            Cite(bib_link='Newell:57'),
-            Cite(bib_link='Laird:87'),
-            Cite(bib_link='Newell:72'),
-            Cite(bib_link='McCarthy:06'),
-            Cite(bib_link='Santoro:22'),
+            *[Cite(bib_link=ref) for ref in spec["related_work"]],
         ),
         Introduction(
-            Cite(bib_link='Brown:20'),
-            Cite(bib_link='Santoro:22'),
-            Cite(bib_link='Ouyang:22'),
-            Cite(bib_link='Santoro:22'),
-            Cite(bib_link='Wei:22'),
+            *[Cite(bib_link=ref) for ref in spec["introduction"]],
         ),
         Abstract(),
         Title(),
         # add at the end to give more details about the implementation
         Appendix(
             Implementation(
-                Source(file_link=(dir_path / "method/symbolicai_docs.txt").as_posix()),
+                Source(file_link=source),
             ),
         ),
-    ))
+        context=spec.get("context"),
+        **kwargs
+    )
 
+
+if __name__ == "__main__":
+    from symai.components import Trace, GraphViz
+
+    parser = argparse.ArgumentParser(description="Generate the SymbolicAI paper.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache.")
+    parser.add_argument("--refresh", action="append", default=[], metavar="SectionType",
+                        help="Regenerate the given section type (e.g. Method, or BibTexParser for source bibliographies) and update the cache. Can be repeated.")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="Location of the response cache database.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of sections generated concurrently.")
+    parser.add_argument("--rpm", type=float, default=60, help="Maximum model requests per minute.")
+    parser.add_argument("--tpm", type=float, default=150_000, help="Maximum model tokens per minute.")
+    parser.add_argument("--top-k", type=int, default=Source.top_k, help="Number of source chunks retrieved per section.")
+    parser.add_argument("--token-budget", type=int, default=Source.token_budget,
+                        help="Token budget for retrieved source chunks per section; 0 sends whole sources.")
+    parser.add_argument("--prompt-budget", type=int, default=0,
+                        help="Default prompt token budget per section; adapted contexts are compressed first. 0 disables budgets.")
+    parser.add_argument("--section-budget", action="append", default=[], metavar="SectionType=TOKENS",
+                        help="Prompt token budget for one section type (e.g. RelatedWork=6000). Can be repeated.")
+    parser.add_argument("--context-priority", action="append", default=[], metavar="SectionType=PRIORITY",
+                        help="Rank the contexts adapted by one section type under a prompt budget; higher ones are compressed last. Can be repeated.")
+    parser.add_argument("--max-repairs", type=int, default=Context.max_repairs,
+                        help="Regenerations of a section whose LaTeX fails validation, with the errors fed back.")
+    parser.add_argument("--incremental", action="store_true", help="Regenerate only sections whose inputs changed since the last build.")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH, help="Location of the incremental build manifest.")
+    parser.add_argument("--dry-run", action="store_true", help="Print which sections would be rebuilt and why, then exit.")
+    parser.add_argument("--stream", action="store_true", help="Rewrite main.tex with placeholders as each section completes.")
+    parser.add_argument("--draft", action="store_true", help="With --stream, run single-pass draft compiles as sections land.")
+    parser.add_argument("--metrics", default=DEFAULT_METRICS_PATH,
+                        help="Location of the per-node JSON run report; a Prometheus dump is written next to it.")
+    parser.add_argument("--summaries", default=DEFAULT_SUMMARY_PATH,
+                        help="Precomputed citation summary index (see summaries.py); used when it exists.")
+    parser.add_argument("--no-summaries", action="store_true", help="Summarize every citation during the build.")
+    parser.add_argument("--routing", action="store_true", help="Route each section type to a model tier (see routing.py).")
+    parser.add_argument("--route", action="append", default=[], metavar="SectionType=TIER",
+                        help="With --routing, override the tier of one section type (e.g. Method=standard). Can be repeated.")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="With --routing, seconds after which sections fall back to faster tiers.")
+    parser.add_argument("--compile-timeout", type=float, default=300.0, help="Timeout in seconds per LaTeX/bibtex pass.")
+    args = parser.parse_args()
+
+    Source.top_k        = args.top_k
+    Source.token_budget = args.token_budget or None
+    Context.cache       = ResponseCache(args.cache_path, enabled=not args.no_cache, refresh=args.refresh)
+    Context.limiter     = RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    Context.max_repairs = args.max_repairs
+    scheduler           = Scheduler(max_workers=args.workers)
+    if args.prompt_budget or args.section_budget:
+        Context.budget  = ContextBudget({name: int(tokens) for name, tokens in (b.split('=') for b in args.section_budget)},
+                                        default=args.prompt_budget or None,
+                                        priorities={name: int(rank) for name, rank in (p.split('=') for p in args.context_priority)})
+    if not args.no_summaries and Path(args.summaries).exists():
+        Cite.summaries  = SummaryIndex(args.summaries)
+    if args.routing:
+        Context.router  = ModelRouter(routes={**DEFAULT_ROUTES, **dict(r.split('=') for r in args.route)},
+                                      deadline=args.deadline)
+    manifest            = BuildManifest(args.manifest) if args.incremental or args.dry_run else None
+
+    template_dir = TEMPLATE_DIR
+    task         = Symbol(DEFAULT_SPEC["task"])
+    hierarchy    = Trace(build_paper(DEFAULT_SPEC, scheduler=scheduler, manifest=manifest))
+
+    if args.dry_run:
+        for node_id, dirty, reason in hierarchy.expr.plan(task):
+            print(f"{'rebuild' if dirty else 'reuse  '} {node_id}: {reason}")
+        raise SystemExit(0)
+
+    if Context.router is not None:
+        Context.router.start()
     doc_gen = DocumentGenerator()
-    res = doc_gen(task, hierarchy) # This will be a Symbol
-    res = { "author": r"\author{GPT4 Turbo, Claudiu Leoveanu-Condrei, Marius-Constantin Dinu}", **res.value }
+    if args.stream:
+        watcher = DraftWatcher("main", template_dir, timeout=args.compile_timeout) if args.draft else None
+        for node_id, _ in doc_gen.stream(task, hierarchy.expr, "main", template_dir, DEFAULT_SPEC["author"], watcher):
+            print(f"Completed {node_id}")
+        if watcher is not None:
+            watcher.close()
+            print(f"Draft compiles: {len(watcher.results)}")
+    else:
+        res = doc_gen(task, hierarchy) # This will be a Symbol
+        res = { "author": DEFAULT_SPEC["author"], **res.value }
 
-    # write the document
-    doc_gen.write_document("main", template_dir, res)
+        # write the document
+        dropped = doc_gen.write_document("main", template_dir, res)
+        if dropped:
+            print(f"Dropped unknown citation keys: {sorted(set(dropped))}")
 
     # compile the document
-    doc_gen.compile_document("main", template_dir)
+    compiled = doc_gen.compile_document("main", template_dir, LatexCompiler(timeout=args.compile_timeout))
+    for error in compiled.errors:
+        print(f"LaTeX error: {error}")
+    print(f"Compiled in {compiled.pass_count} passes ({compiled.seconds:.1f}s, bibtex {'skipped' if compiled.bibtex_skipped else 'run'}): "
+          f"{'ok' if compiled.success else 'failed'}, {len(compiled.warnings)} warnings")
+
+    # visualize the computation graph; streamed builds bypass the trace
+    if not args.stream:
+        GraphViz()(hierarchy, 'tmp/paper.html')
 
-    # visualize the computation graph
-    GraphViz()(hierarchy, 'tmp/paper.html')
+    hierarchy.expr.metrics.save(args.metrics, scheduler.deps)
+    print(hierarchy.expr.metrics.view(scheduler.deps))
+    for phase in scheduler.report(hierarchy.expr.sections):
+        print(f"Phase {phase['phase']} ({', '.join(phase['nodes'])}): {phase['wall_time']:.1f}s")
+    if manifest is not None:
+        print(f"Incremental build: reused {manifest.reused}, rebuilt {manifest.rebuilt}")
+    print(f"Response cache: {Context.cache.stats()}")
+    summaries = hierarchy.expr.memo.report()
+    print(f"Source/Cite summaries: {summaries['computed']} computed, {summaries['saved']} model calls saved by deduplication")
+    if Cite.summaries is not None:
+        print(f"Precomputed citation summaries: {hierarchy.expr.metrics.totals()['precomputed']} used")
+    if Context.budget is not None:
+        for section, entry in Context.budget.report.items():
+            print(f"{section}: {sum(entry['before'].values())} -> {sum(entry['after'].values())} prompt tokens "
+                  f"over {entry['calls']} calls (dynamic {entry['before']['dynamic']} -> {entry['after']['dynamic']}, "
+                  f"task {entry['before']['task']} -> {entry['after']['task']})")
+    if Context.router is not None:
+        print(Context.router.view())
+    for section, tokens in Source.retrieval_report.items():
+        print(f"{section}: {tokens['prompt_tokens']} of {tokens['source_tokens']} source tokens ({tokens['saved_tokens']} saved)")
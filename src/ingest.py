@@ -0,0 +1,253 @@
+import hashlib
+import json
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from files import write_atomic
+
+
+DEFAULT_HTTP_CACHE_DIR = (Path(__file__).parent.absolute() / "tmp" / "cache" / "http").as_posix()
+MAX_REDIRECTS          = 5
+# raised when a keep-alive connection was closed by the server while idle;
+# http.client.RemoteDisconnected is a ConnectionResetError
+STALE_ERRORS           = (ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+BLOCK_TAGS             = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'pre'}
+
+
+class TextExtractor(HTMLParser):
+    # visible text of an HTML page; block elements become line breaks
+    def __init__(self):
+        super().__init__()
+        self.parts  = []
+        self.hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style', 'noscript'):
+            self.hidden += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style', 'noscript'):
+            self.hidden = max(self.hidden - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.hidden:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        text = re.sub(r"[ \t\r\f\v]+", " ", ''.join(self.parts))
+        return re.sub(r"\s*\n\s*", "\n", text).strip()
+
+
+class ConnectionPool:
+    # keep-alive connections per host, at most `max_per_host` requests in flight per host
+    def __init__(self, max_per_host: int = 4, timeout: float = 30.0):
+        self.max_per_host = max_per_host
+        self.timeout      = timeout
+        self._idle: Dict[tuple, queue.SimpleQueue] = {}
+        self._slots: Dict[tuple, threading.Semaphore] = {}
+        self._lock        = threading.Lock()
+
+    @contextmanager
+    def connection(self, scheme: str, host: str, port: Optional[int], fresh: bool = False):
+        # yields `(connection, reused)`; `fresh` skips the idle connections
+        key = (scheme, host, port)
+        with self._lock:
+            idle  = self._idle.setdefault(key, queue.SimpleQueue())
+            slots = self._slots.setdefault(key, threading.Semaphore(self.max_per_host))
+        with slots:
+            try:
+                if fresh:
+                    raise queue.Empty()
+                conn   = idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                reused = False
+                # imported on first connection; http.client alone doubles the import time of `components`
+                import http.client
+                import ssl
+                if scheme == 'https':
+                    conn = http.client.HTTPSConnection(host, port, timeout=self.timeout, context=ssl.create_default_context())
+                else:
+                    conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+            try:
+                yield conn, reused
+            except Exception:
+                conn.close()
+                raise
+            idle.put(conn)
+
+
+class HttpCache:
+    # response bodies with their validators, plus extracted text and parsed BibTeX per URL;
+    # derived entries are tied to the body hash they were computed from
+    def __init__(self, path: str = DEFAULT_HTTP_CACHE_DIR):
+        self.path = Path(path)
+
+    def key(self, url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def meta(self, url: str) -> Optional[dict]:
+        path = self.path / f"{self.key(url)}.json"
+        if not path.exists():
+            return None
+        meta = json.loads(path.read_text())
+        return meta if self.body_path(url, meta).exists() else None
+
+    def body_path(self, url: str, meta: dict) -> Path:
+        # readers such as the PDF reader dispatch on the file suffix
+        return self.path / f"{self.key(url)}{'.pdf' if 'pdf' in meta.get('content_type', '') else '.body'}"
+
+    def save(self, url: str, meta: dict, body: bytes):
+        write_atomic(self.body_path(url, meta), body)
+        write_atomic(self.path / f"{self.key(url)}.json", json.dumps(meta))
+
+    def derived(self, url: str, kind: str, body_hash: str):
+        path = self.path / f"{self.key(url)}.{kind}.json"
+        if not path.exists():
+            return None
+        entry = json.loads(path.read_text())
+        return entry['value'] if entry['body'] == body_hash else None
+
+    def save_derived(self, url: str, kind: str, body_hash: str, value):
+        write_atomic(self.path / f"{self.key(url)}.{kind}.json", json.dumps({'body': body_hash, 'value': value}))
+
+
+class Ingestor:
+    # concurrent URL fetching with conditional requests against the on-disk cache;
+    # `readers` map content types to callables extracting text from the cached body file
+    def __init__(self,
+                 cache_dir: str = DEFAULT_HTTP_CACHE_DIR,
+                 max_workers: int = 16,
+                 max_per_host: int = 4,
+                 timeout: float = 30.0,
+                 readers: Optional[Dict[str, Callable[[str], str]]] = None):
+        self.cache   = HttpCache(cache_dir)
+        self.pool    = ConnectionPool(max_per_host=max_per_host, timeout=timeout)
+        self.readers = dict(readers or {})
+        self.stats   = {"requests": 0, "downloaded": 0, "not_modified": 0, "text_hits": 0, "bib_hits": 0,
+                        "reconnects": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures: Dict[str, Future] = {}
+        self._lock   = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def exchange(self, parts, path: str, headers: dict, fresh: bool = False) -> Optional[tuple]:
+        # `(response, body)`, or None if a reused keep-alive connection had been closed by the server
+        with self.pool.connection(parts.scheme, parts.hostname, parts.port, fresh=fresh) as (conn, reused):
+            try:
+                conn.request('GET', path, headers={'User-Agent': 'docmatic', **headers})
+                response = conn.getresponse()
+                body     = response.read()
+            except STALE_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                return None
+            if response.will_close:
+                conn.close()
+        return response, body
+
+    def request(self, url: str, headers: dict) -> Tuple[int, dict, bytes, str]:
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            path  = parts.path or '/'
+            if parts.query:
+                path = f"{path}?{parts.query}"
+            exchanged = self.exchange(parts, path, headers)
+            if exchanged is None:
+                # one retry on a new connection
+                self.count("reconnects")
+                exchanged = self.exchange(parts, path, headers, fresh=True)
+            response, body = exchanged
+            self.count("requests")
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            return response.status, {k.lower(): v for k, v in response.getheaders()}, body, url
+        raise RuntimeError(f"Too many redirects for {url}.")
+
+    def fetch(self, url: str) -> Tuple[dict, Path]:
+        # revalidate with ETag/Last-Modified; a 304 keeps the cached body
+        meta    = self.cache.meta(url)
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        status, response, body, final = self.request(url, headers)
+        if status == 304 and meta is not None:
+            self.count("not_modified")
+            return meta, self.cache.body_path(url, meta)
+        if status != 200:
+            raise RuntimeError(f"GET {url} returned HTTP {status}.")
+        self.count("downloaded")
+        meta = {'url': final,
+                'etag': response.get('etag'),
+                'last_modified': response.get('last-modified'),
+                'content_type': response.get('content-type', ''),
+                'body': hashlib.sha256(body).hexdigest(),
+                'fetched': time.time()}
+        self.cache.save(url, meta, body)
+        return meta, self.cache.body_path(url, meta)
+
+    def extract(self, meta: dict, path: Path) -> str:
+        content_type = meta['content_type'].split(';')[0].strip()
+        if content_type in self.readers:
+            return self.readers[content_type](path.as_posix())
+        text = path.read_bytes().decode('utf-8', errors='replace')
+        if 'html' in content_type:
+            parser = TextExtractor()
+            parser.feed(text)
+            return parser.text()
+        return text
+
+    def ingest(self, url: str, parse: Optional[Callable[[str], list]] = None) -> Tuple[str, Optional[list]]:
+        meta, path = self.fetch(url)
+        text = self.cache.derived(url, 'text', meta['body'])
+        if text is None:
+            text = self.extract(meta, path)
+            self.cache.save_derived(url, 'text', meta['body'], text)
+        else:
+            self.count("text_hits")
+        if parse is None:
+            return text, None
+        return text, self.bibtex(url, text, parse, meta['body'])
+
+    def bibtex(self, url: str, text: str, parse: Callable[[str], list], body_hash: Optional[str] = None) -> list:
+        # parsed BibTeX of an ingested URL, cached against the body the text was extracted from;
+        # callers may parse later than the download
+        if body_hash is None:
+            meta      = self.cache.meta(url)
+            body_hash = meta['body'] if meta is not None else None
+        bib = self.cache.derived(url, 'bib', body_hash) if body_hash is not None else None
+        if bib is None:
+            bib = parse(text)
+            if body_hash is not None:
+                self.cache.save_derived(url, 'bib', body_hash, bib)
+        else:
+            self.count("bib_hits")
+        return bib
+
+    def submit(self, url: str, parse: Optional[Callable[[str], list]] = None) -> Future:
+        # one ingestion per URL and process; later requests share the future
+        with self._lock:
+            future = self._futures.get(url)
+            if future is None:
+                future = self._futures[url] = self._executor.submit(self.ingest, url, parse)
+        return future
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+
+RERUN_PATTERN    = re.compile(r"Rerun to get|Label\(s\) may have changed|There were undefined references|Rerun LaTeX")
+WARNING_PATTERN  = re.compile(r"^(?:LaTeX|Package|Class)\b.*Warning:.*$|^LaTeX Warning:.*$", re.MULTILINE)
+CITATION_PATTERN = re.compile(r"\\citation\{([^}]*)\}")
+BIBDATA_PATTERN  = re.compile(r"\\bibdata\{([^}]*)\}")
+# bibtex reports errors as `<message>---line <n> of file <name>`, with the message possibly on the previous line
+BLG_PATTERN      = re.compile(r"^(.*?)---(line \d+ of file \S+|while reading file \S+)", re.MULTILINE)
+
+
+@dataclass
+class PassResult:
+    command: str
+    returncode: Optional[int]
+    seconds: float
+    timed_out: bool = False
+
+
+@dataclass
+class CompileResult:
+    success: bool                   = False
+    passes: List[PassResult]        = field(default_factory=list)
+    errors: List[str]               = field(default_factory=list)
+    warnings: List[str]             = field(default_factory=list)
+    bibtex_skipped: bool            = False
+
+    @property
+    def pass_count(self) -> int:
+        return len([p for p in self.passes if p.command != 'bibtex'])
+
+    @property
+    def seconds(self) -> float:
+        return sum(p.seconds for p in self.passes)
+
+
+def parse_log(log: str) -> tuple:
+    # TeX errors start with `!` and are followed by the offending line `l.<n> ...`
+    errors   = []
+    lines    = log.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith('!'):
+            context = next((l for l in lines[i + 1:i + 8] if l.startswith('l.')), '')
+            errors.append(f"{line} {context}".strip())
+    warnings = sorted(set(WARNING_PATTERN.findall(log)))
+    return errors, warnings
+
+
+def parse_blg(blg: str) -> List[str]:
+    lines  = blg.splitlines()
+    errors = []
+    for match in BLG_PATTERN.finditer(blg):
+        message = match.group(1).strip()
+        if not message:
+            n       = blg.count('\n', 0, match.start())
+            message = lines[n - 1].strip() if n > 0 else ''
+        errors.append(f"bibtex: {message} ({match.group(2)})")
+    return errors
+
+
+class LatexCompiler:
+    def __init__(self,
+                 engine: str = 'lualatex',
+                 bibtex: Optional[str] = 'bibtex',
+                 max_passes: int = 4,
+                 timeout: float = 300.0):
+        self.engine     = engine
+        self.bibtex     = bibtex
+        self.max_passes = max_passes
+        self.timeout    = timeout
+
+    def env(self, template_dir: Path) -> dict:
+        # per-call environment instead of mutating os.environ
+        return {**os.environ,
+                'TEXINPUTS': f"{template_dir}:{os.environ.get('TEXINPUTS', '')}",
+                'openout_any': 'a'}
+
+    def run(self, command: List[str], template_dir: Path, result: CompileResult) -> bool:
+        start = time.monotonic()
+        try:
+            proc = subprocess.run(command, cwd=template_dir, env=self.env(template_dir),
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=self.timeout)
+            result.passes.append(PassResult(Path(command[0]).name, proc.returncode, time.monotonic() - start))
+            return True
+        except subprocess.TimeoutExpired:
+            result.passes.append(PassResult(Path(command[0]).name, None, time.monotonic() - start, timed_out=True))
+            result.errors.append(f"{command[0]} timed out after {self.timeout}s")
+            return False
+        except FileNotFoundError:
+            result.errors.append(f"{command[0]} not found on PATH")
+            return False
+
+    @staticmethod
+    def read(path: Path) -> str:
+        return path.read_text(errors='replace') if path.exists() else ''
+
+    def bib_state(self, template_dir: Path, aux: str) -> str:
+        # citation keys plus the content of the referenced .bib files decide whether bibtex must run
+        keys  = sorted({k.strip() for group in CITATION_PATTERN.findall(aux) for k in group.split(',')})
+        files = [f.strip() for group in BIBDATA_PATTERN.findall(aux) for f in group.split(',')]
+        bibs  = [hashlib.sha256(self.read(template_dir / f"{f}.bib").encode('utf-8')).hexdigest() for f in files]
+        return hashlib.sha256(json.dumps([keys, files, bibs]).encode('utf-8')).hexdigest()
+
+    def __call__(self, document_name: str, template_dir: Path) -> CompileResult:
+        template_dir = Path(template_dir)
+        result       = CompileResult()
+        aux_path     = template_dir / f"{document_name}.aux"
+        log_path     = template_dir / f"{document_name}.log"
+        state_path   = template_dir / f"{document_name}.bibstate"
+        latex        = [self.engine, '--interaction=batchmode', f'--output-directory={template_dir}', f"{document_name}.tex"]
+        previous_aux = self.read(aux_path)
+        bibtex_ran   = False
+
+        for n in range(self.max_passes):
+            if not self.run(latex, template_dir, result):
+                break
+            aux = self.read(aux_path)
+            log = self.read(log_path)
+            # TeX errors in batch mode are not fatal; errors of all passes are kept, warnings of the last one
+            errors, result.warnings = parse_log(log)
+            result.errors += [e for e in errors if e not in result.errors]
+            if n == 0 and self.bibtex is None:
+                result.bibtex_skipped = True
+            elif n == 0:
+                # skip bibtex when the cited keys and bibliography files are unchanged
+                state = self.bib_state(template_dir, aux)
+                bbl   = template_dir / f"{document_name}.bbl"
+                if CITATION_PATTERN.search(aux) and (not bbl.exists() or self.read(state_path) != state):
+                    if not self.run([self.bibtex, document_name], template_dir, result):
+                        break
+                    if result.passes[-1].returncode == 0:
+                        state_path.write_text(state)
+                    else:
+                        blg = parse_blg(self.read(template_dir / f"{document_name}.blg"))
+                        result.errors += blg or [f"{self.bibtex} exited with code {result.passes[-1].returncode}"]
+                    bibtex_ran = True
+                else:
+                    result.bibtex_skipped = True
+            # stable once labels and references stopped changing
+            stable       = aux == previous_aux and not RERUN_PATTERN.search(log)
+            previous_aux = aux
+            if stable and not (n == 0 and bibtex_ran):
+                break
+
+        result.success = not result.errors and all(p.returncode == 0 for p in result.passes) \
+                         and (template_dir / f"{document_name}.pdf").exists()
+        return result
+
+
+def compile_in(document_name: str, template_dir: str, timeout: float = 300.0) -> CompileResult:
+    # module-level entry point for process pools
+    return LatexCompiler(timeout=timeout)(document_name, Path(template_dir))
+
+
+class DraftWatcher:
+    # single-pass compiles without bibtex while sections are still being generated;
+    # notifications during a running compile coalesce into one follow-up compile
+    def __init__(self, document_name: str, template_dir: Path, timeout: float = 60.0):
+        self.document_name = document_name
+        self.template_dir  = Path(template_dir)
+        self.compiler      = LatexCompiler(bibtex=None, max_passes=1, timeout=timeout)
+        self.results: List[CompileResult] = []
+        self._dirty        = threading.Event()
+        self._closed       = False
+        self._thread       = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        self._dirty.set()
+
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            self._dirty.clear()
+            if self._closed:
+                return
+            self.results.append(self.compiler(self.document_name, self.template_dir))
+
+    def close(self):
+        # the final compile is left to the caller
+        self._closed = True
+        self._dirty.set()
+        self._thread.join()
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from files import write_atomic
+
+
+DEFAULT_MANIFEST_PATH = (Path(__file__).parent.absolute() / "tmp" / "build" / "manifest.json").as_posix()
+
+
+def fingerprint(*parts) -> str:
+    blob = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+    # per-node record of input fingerprints and outputs of the last build
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path    = path
+        self.entries: Dict[str, dict] = {}
+        self.reused  = []
+        self.rebuilt = []
+        self._lock   = threading.Lock()
+        if Path(path).exists():
+            with open(path, 'r') as file:
+                self.entries = json.load(file)
+
+    def lookup(self, node_id: str, inputs: str, upstream: List[str]) -> Optional[dict]:
+        # clean if the node's own inputs and the outputs it was built from are unchanged
+        entry = self.entries.get(node_id)
+        if entry is None or entry['inputs'] != inputs or entry['upstream'] != upstream:
+            return None
+        return entry
+
+    def record(self, node_id: str, inputs: str, upstream: List[str], output: str, adapted: Optional[str] = None):
+        with self._lock:
+            self.entries[node_id] = {
+                'inputs': inputs,
+                'upstream': upstream,
+                'output': output,
+                'output_hash': fingerprint(output),
+                'adapted': adapted,
+            }
+
+    def plan(self, nodes: Dict[str, str], deps: Dict[str, List[str]]) -> List[tuple]:
+        # `nodes` maps ids (in topological order) to input fingerprints; returns (id, dirty, reason)
+        dirty = {}
+        plan  = []
+        for node_id, inputs in nodes.items():
+            entry = self.entries.get(node_id)
+            if entry is None:
+                reason = 'not built before'
+            elif entry['inputs'] != inputs:
+                reason = 'inputs changed'
+            elif any(dirty.get(dep) for dep in deps[node_id]):
+                reason = 'upstream rebuilt: ' + ', '.join(dep for dep in deps[node_id] if dirty.get(dep))
+            else:
+                reason = None
+            dirty[node_id] = reason is not None
+            plan.append((node_id, dirty[node_id], reason or 'clean'))
+        return plan
+
+    def save(self):
+        # called from the scheduler's worker threads; the lock keeps writes in the order of their snapshots
+        with self._lock:
+            write_atomic(self.path, json.dumps(self.entries, indent=2))
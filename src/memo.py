@@ -0,0 +1,39 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class RunMemo:
+    # per-run memoization; concurrent requests for the same key wait for the first computation
+    def __init__(self):
+        self.results: Dict[Hashable, Any] = {}
+        self.calls   = 0
+        self.saved   = 0
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._lock   = threading.Lock()
+
+    def __call__(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key in self.results:
+                with self._lock:
+                    self.saved += 1
+                return self.results[key]
+            res = compute()
+            with self._lock:
+                self.calls += 1
+                self.results[key] = res
+            return res
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.results
+
+    def clear(self):
+        with self._lock:
+            self.results.clear()
+            self._locks.clear()
+            self.calls = 0
+            self.saved = 0
+
+    def report(self) -> dict:
+        return {"computed": self.calls, "saved": self.saved}
@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from files import write_atomic
+
+
+DEFAULT_METRICS_PATH = (Path(__file__).parent.absolute() / "tmp" / "metrics" / "run.json").as_posix()
+# counters summed into the run totals and exported to Prometheus
+COUNTERS             = ['wall_s', 'queue_s', 'prompt_tokens', 'completion_tokens', 'calls',
+                        'retries', 'cache_hits', 'cache_misses', 'output_bytes', 'repairs', 'invalid', 'precomputed']
+
+
+@dataclass
+class NodeMetrics:
+    node: str
+    type: str
+    parent: Optional[str]    = None
+    children: List[str]      = field(default_factory=list)
+    start: Optional[float]   = None
+    end: Optional[float]     = None
+    wall_s: float            = 0.0
+    # scheduler queue plus rate limiter waits
+    queue_s: float           = 0.0
+    prompt_tokens: int       = 0
+    completion_tokens: int   = 0
+    calls: int               = 0
+    retries: int             = 0
+    cache_hits: int          = 0
+    cache_misses: int        = 0
+    output_bytes: int        = 0
+    # regenerations after failed LaTeX validation and outputs still invalid afterwards
+    repairs: int             = 0
+    invalid: int             = 0
+    # citations served from the precomputed summary index
+    precomputed: int         = 0
+    reused: bool             = False
+
+
+class RunMetrics:
+    # per-node measurements of one paper build; nodes are registered by object identity
+    def __init__(self):
+        self.nodes: Dict[str, NodeMetrics] = {}
+        self.started = time.monotonic()
+        self._ids: Dict[int, str] = {}
+        self._local  = threading.local()
+        self._lock   = threading.Lock()
+
+    def register(self, nodes: List[Any], parent: Optional[str] = None):
+        # top-level ids match `Paper.node_id`; nested ones are prefixed with their parent
+        for j, node in enumerate(nodes):
+            name = f"{j}:{type(node).__name__}" if parent is None else f"{parent}/{j}:{type(node).__name__}"
+            self._ids[id(node)] = name
+            self.nodes[name]    = NodeMetrics(node=name, type=type(node).__name__, parent=parent)
+            if parent is not None:
+                self.nodes[parent].children.append(name)
+            self.register(getattr(node, 'children', []), parent=name)
+
+    def get(self, node) -> Optional[NodeMetrics]:
+        name = self._ids.get(id(node))
+        return self.nodes.get(name) if name is not None else None
+
+    def add(self, node, **deltas):
+        metrics = self.get(node)
+        if metrics is None:
+            return
+        with self._lock:
+            for key, value in deltas.items():
+                setattr(metrics, key, getattr(metrics, key) + value)
+
+    @contextmanager
+    def span(self, node):
+        # wall time and output size of the outermost span per node and thread; nested spans
+        # of the same node are no-ops. Yields a callback receiving the node's output.
+        active  = self._local.__dict__.setdefault('active', set())
+        metrics = self.get(node)
+        if metrics is None or id(node) in active:
+            yield lambda res: None
+            return
+        active.add(id(node))
+        start = time.monotonic()
+        try:
+            yield lambda res: self.add(node, output_bytes=len(str(res).encode('utf-8')))
+        finally:
+            end = time.monotonic()
+            active.discard(id(node))
+            with self._lock:
+                metrics.start   = start - self.started if metrics.start is None else metrics.start
+                metrics.end     = end - self.started
+                metrics.wall_s += end - start
+
+    def totals(self) -> dict:
+        # counters are recorded on the node issuing the call, so the run totals sum over all nodes
+        totals = {key: sum(getattr(m, key) for m in self.nodes.values()) for key in COUNTERS if key != 'wall_s'}
+        ends   = [m.end for m in self.nodes.values() if m.end is not None]
+        totals['wall_s'] = max(ends, default=0.0)
+        return totals
+
+    def critical_path(self, deps: Dict[int, set]) -> List[str]:
+        # walk back from the last finishing section through the dependency that finished last,
+        # then descend into the slowest child of every section on the path
+        top  = [m for m in self.nodes.values() if m.parent is None]
+        done = [m for m in top if m.end is not None]
+        if not done:
+            return []
+        index = {m.node: j for j, m in enumerate(top)}
+        path  = []
+        node  = max(done, key=lambda m: m.end)
+        while node is not None:
+            path.append(node)
+            upstream = [top[i] for i in deps.get(index[node.node], ()) if top[i].end is not None]
+            node     = max(upstream, key=lambda m: m.end, default=None)
+        path = path[::-1]
+        res  = []
+        for node in path:
+            res.append(node.node)
+            while node.children:
+                node = max((self.nodes[c] for c in node.children), key=lambda m: m.wall_s)
+                res.append(node.node)
+        return res
+
+    def report(self, deps: Dict[int, set]) -> dict:
+        return {
+            "totals": self.totals(),
+            "critical_path": self.critical_path(deps),
+            "nodes": [asdict(m) for m in self.nodes.values()],
+        }
+
+    def view(self, deps: Dict[int, set]) -> str:
+        # indented tree; `*` marks nodes on the critical path
+        critical = set(self.critical_path(deps))
+        lines    = [f"{'node':<48} {'wall':>8} {'queue':>7} {'tokens':>8} {'retries':>7} {'cache':>7} {'bytes':>8}"]
+        def render(name, depth):
+            m     = self.nodes[name]
+            label = f"{'*' if name in critical else ' '} {'  ' * depth}{m.type}{' (reused)' if m.reused else ''}"
+            lines.append(f"{label:<48} {m.wall_s:>7.2f}s {m.queue_s:>6.2f}s {m.prompt_tokens + m.completion_tokens:>8} "
+                         f"{m.retries:>7} {m.cache_hits:>3}/{m.cache_hits + m.cache_misses:<3} {m.output_bytes:>8}")
+            for child in m.children:
+                render(child, depth + 1)
+        for m in self.nodes.values():
+            if m.parent is None:
+                render(m.node, 0)
+        return '\n'.join(lines)
+
+    def prometheus(self, prefix: str = 'paper') -> str:
+        # text exposition format, one sample per node and counter; the run's wall time is the
+        # elapsed time of the build, not a sum, and stays a gauge
+        lines = []
+        for key in COUNTERS:
+            metric = f"{prefix}_node_{key}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for m in self.nodes.values():
+                lines.append(f'{metric}{{node="{m.node}",type="{m.type}"}} {getattr(m, key)}')
+        for key, value in self.totals().items():
+            metric, kind = (f"{prefix}_run_{key}", 'gauge') if key == 'wall_s' else (f"{prefix}_run_{key}_total", 'counter')
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path: str, deps: Dict[int, set]):
+        # `<path>` gets the JSON report and `<stem>.prom` the Prometheus dump
+        path = Path(path)
+        for target, content in [(path, json.dumps(self.report(deps), indent=2)),
+                                (path.with_suffix('.prom'), self.prometheus())]:
+            write_atomic(target, content)
@@ -0,0 +1,59 @@
+import re
+import threading
+from pathlib import Path
+from typing import Container, Dict, List, Tuple
+
+
+PLACEHOLDER_PATTERN = re.compile(r"%TODO\{(\w+)\}")
+# \cite, \citep and \citet with an optional star and up to two optional arguments
+CITE_PATTERN        = re.compile(r"\\(cite[pt]?)(\*?)((?:\s*\[[^\]]*\]){0,2})\s*\{([^}]*)\}")
+
+
+class RenderPlan:
+    # template split once into literal text and placeholder keys, cached per file version
+    _plans: Dict[str, 'RenderPlan'] = {}
+    _lock   = threading.Lock()
+
+    def __init__(self, template: str):
+        self.parts: List[Tuple[bool, str]] = []
+        last = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            self.parts.append((False, template[last:match.start()]))
+            self.parts.append((True, match.group(1)))
+            last = match.end()
+        self.parts.append((False, template[last:]))
+
+    @classmethod
+    def load(cls, path: str) -> 'RenderPlan':
+        stat  = Path(path).stat()
+        stamp = f"{Path(path).resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+        with cls._lock:
+            plan = cls._plans.get(stamp)
+        if plan is None:
+            plan = cls(Path(path).read_text())
+            with cls._lock:
+                cls._plans[stamp] = plan
+        return plan
+
+    @property
+    def keys(self) -> List[str]:
+        return [value for is_key, value in self.parts if is_key]
+
+    def render(self, content: Dict[str, str]) -> str:
+        # placeholders without content are kept as they are
+        return ''.join(content.get(value, f"%TODO{{{value}}}") if is_key else value for is_key, value in self.parts)
+
+
+def prune_citations(text: str, keys: Container[str]) -> Tuple[str, List[str]]:
+    # drop unknown keys from every citation command; commands left without keys are removed
+    dropped = []
+    def prune(match):
+        cited = [key.strip() for key in match.group(4).split(',') if key.strip()]
+        valid = [key for key in cited if key in keys]
+        dropped.extend(key for key in cited if key not in keys)
+        if not valid:
+            return ''
+        if len(valid) == len(cited):
+            return match.group(0)
+        return f"\\{match.group(1)}{match.group(2)}{match.group(3)}{{{','.join(valid)}}}"
+    return CITE_PATTERN.sub(prune, text), dropped
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import List, Optional
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    # cheap estimate; the engines count exactly, this only drives budgets
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def chunk(text: str, chunk_tokens: int = 300) -> List[str]:
+    # greedily pack paragraphs into chunks; oversized paragraphs are split by lines
+    limit   = chunk_tokens * CHARS_PER_TOKEN
+    chunks  = []
+    current = ''
+    for block in re.split(r"\n\s*\n", text):
+        parts = [block] if len(block) <= limit else block.splitlines()
+        for part in parts:
+            # slices of an oversized part follow the text packed before it
+            if len(part) > limit and current:
+                chunks.append(current)
+                current = ''
+            while len(part) > limit:
+                chunks.append(part[:limit])
+                part = part[limit:]
+            if current and len(current) + len(part) + 2 > limit:
+                chunks.append(current)
+                current = ''
+            current = f"{current}\n\n{part}" if current else part
+    if current.strip():
+        chunks.append(current)
+    return [c for c in chunks if c.strip()]
+
+
+class LexicalIndex:
+    # BM25 over chunks using sparse postings in NumPy arrays; numpy is imported on first use
+    # so that importing `components` stays cheap
+    def __init__(self, chunks: List[str], checksum: str = '', k1: float = 1.5, b: float = 0.75):
+        import numpy as np
+        self.chunks   = chunks
+        self.checksum = checksum
+        self.k1       = k1
+        self.b        = b
+        vocab, rows, cols, tfs = {}, [], [], []
+        for i, text in enumerate(chunks):
+            counts = {}
+            for term in tokenize(text):
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                rows.append(vocab.setdefault(term, len(vocab)))
+                cols.append(i)
+                tfs.append(tf)
+        self.vocab    = vocab
+        self.lengths  = np.array([len(tokenize(c)) for c in chunks], dtype=np.float32)
+        order         = np.argsort(np.array(rows, dtype=np.int64), kind='stable')
+        self.terms    = np.array(rows, dtype=np.int64)[order]
+        self.docs     = np.array(cols, dtype=np.int32)[order]
+        self.tfs      = np.array(tfs, dtype=np.float32)[order]
+        self.offsets  = np.searchsorted(self.terms, np.arange(len(vocab) + 1))
+
+    @classmethod
+    def load_or_build(cls, text: str, path: Optional[str] = None, chunk_tokens: int = 300) -> 'LexicalIndex':
+        # persisted next to the source as `<name>.index.npz` and rebuilt when the content changes
+        checksum = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if path is not None:
+            index = Path(f"{path}.index.npz")
+            if index.exists():
+                try:
+                    loaded = cls.load(index)
+                    if loaded.checksum == checksum:
+                        return loaded
+                except Exception:
+                    pass
+        res = cls(chunk(text, chunk_tokens), checksum=checksum)
+        if path is not None:
+            res.save(Path(f"{path}.index.npz"))
+        return res
+
+    def save(self, path: Path):
+        import numpy as np
+        meta = json.dumps({'checksum': self.checksum, 'k1': self.k1, 'b': self.b,
+                           'chunks': self.chunks, 'vocab': self.vocab})
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, meta=np.frombuffer(meta.encode('utf-8'), dtype=np.uint8),
+                                lengths=self.lengths, terms=self.terms, docs=self.docs,
+                                tfs=self.tfs, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path: Path) -> 'LexicalIndex':
+        import numpy as np
+        data = np.load(path)
+        meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+        res  = cls.__new__(cls)
+        res.chunks, res.checksum = meta['chunks'], meta['checksum']
+        res.k1, res.b, res.vocab = meta['k1'], meta['b'], meta['vocab']
+        for name in ['lengths', 'terms', 'docs', 'tfs', 'offsets']:
+            setattr(res, name, data[name])
+        return res
+
+    def scores(self, query: str) -> 'numpy.ndarray':
+        import numpy as np
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        if len(self.chunks) == 0:
+            return scores
+        avgdl  = max(float(self.lengths.mean()), 1.0)
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs, tfs  = self.docs[start:end], self.tfs[start:end]
+            idf        = np.log(1 + (len(self.chunks) - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm       = self.k1 * (1 - self.b + self.b * self.lengths[docs] / avgdl)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        return scores
+
+    def select(self, query: str, top_k: int = 8, token_budget: Optional[int] = None) -> List[str]:
+        # best scoring chunks within the budget, returned in document order
+        import numpy as np
+        ranked   = np.argsort(-self.scores(query), kind='stable')[:top_k]
+        selected = []
+        used     = 0
+        for i in ranked:
+            tokens = count_tokens(self.chunks[i])
+            if token_budget is not None and used + tokens > token_budget:
+                continue
+            selected.append(int(i))
+            used += tokens
+        return [self.chunks[i] for i in sorted(selected)]
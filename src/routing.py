@@ -0,0 +1,123 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class Tier:
+    name: str
+    model: str
+    max_tokens: int
+    # USD per 1k tokens
+    prompt_price: float     = 0.0
+    completion_price: float = 0.0
+    # faster tier used under rate limit pressure or when the deadline is at risk
+    fallback: Optional[str] = None
+
+
+DEFAULT_TIERS = {
+    "fast": Tier("fast", "gpt-3.5-turbo", 512, prompt_price=0.0005, completion_price=0.0015),
+    "standard": Tier("standard", "gpt-4-turbo", 2048, prompt_price=0.01, completion_price=0.03, fallback="fast"),
+    "strong": Tier("strong", "gpt-4", 4096, prompt_price=0.03, completion_price=0.06, fallback="standard"),
+    "vision": Tier("vision", "gpt-4-vision-preview", 300, prompt_price=0.01, completion_price=0.03),
+}
+# section classes by their type name; unlisted sections use the router's default tier
+DEFAULT_ROUTES = {
+    "Source": "standard",
+    "Cite": "fast",
+    "CitationSummary": "fast",
+    "Title": "fast",
+    "Abstract": "standard",
+    "Introduction": "standard",
+    "RelatedWork": "standard",
+    "Method": "strong",
+    "Algorithm": "strong",
+    "Implementation": "strong",
+    "Conclusion": "standard",
+    "Image": "vision",
+}
+
+
+class ModelRouter:
+    # maps section types to model tiers; a tier with recent rate limit errors or long limiter
+    # waits, or whose mean latency no longer fits before `deadline` seconds, yields to its fallback
+    def __init__(self,
+                 tiers: Dict[str, Tier] = DEFAULT_TIERS,
+                 routes: Dict[str, str] = DEFAULT_ROUTES,
+                 default: str = "standard",
+                 deadline: Optional[float] = None,
+                 max_wait: float = 5.0,
+                 cooldown: float = 30.0):
+        unknown = (set(routes.values()) | {default} | {t.fallback for t in tiers.values() if t.fallback}) - set(tiers)
+        assert not unknown, f"Unknown tiers: {sorted(unknown)}."
+        self.tiers    = tiers
+        self.routes   = routes
+        self.default  = default
+        self.deadline = deadline
+        self.max_wait = max_wait
+        self.cooldown = cooldown
+        self.started  = time.monotonic()
+        self.report   = {name: {"calls": 0, "fallbacks": 0, "rate_limits": 0, "latency_s": 0.0,
+                                "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0} for name in tiers}
+        self._pressure: Dict[str, float] = {}
+        self._lock    = threading.Lock()
+
+    def start(self):
+        # the deadline counts from here
+        self.started = time.monotonic()
+
+    def mean_latency(self, tier: str) -> float:
+        entry = self.report[tier]
+        return entry["latency_s"] / entry["calls"] if entry["calls"] else 0.0
+
+    def under_pressure(self, tier: Tier) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            limited = now - self._pressure.get(tier.name, float('-inf')) < self.cooldown
+        late = self.deadline is not None and now - self.started + self.mean_latency(tier.name) > self.deadline
+        return limited or late
+
+    def tier(self, section: str) -> Tier:
+        # configured tier, before any fallback
+        return self.tiers[self.routes.get(section, self.default)]
+
+    def route(self, section: str) -> Tier:
+        tier = self.tier(section)
+        while tier.fallback is not None and self.under_pressure(tier):
+            tier = self.tiers[tier.fallback]
+        return tier
+
+    def kwargs(self, tier: Tier) -> dict:
+        # honored by the symai engines
+        return {'model': tier.model, 'max_tokens': tier.max_tokens}
+
+    def rate_limited(self, tier: Tier):
+        with self._lock:
+            self._pressure[tier.name] = time.monotonic()
+            self.report[tier.name]["rate_limits"] += 1
+
+    def waited(self, tier: Tier, seconds: float):
+        if seconds > self.max_wait:
+            with self._lock:
+                self._pressure[tier.name] = time.monotonic()
+
+    def record(self, tier: Tier, section: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0):
+        with self._lock:
+            entry = self.report[tier.name]
+            entry["calls"]             += 1
+            entry["fallbacks"]         += int(tier.name != self.routes.get(section, self.default))
+            entry["latency_s"]         += seconds
+            entry["prompt_tokens"]     += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["cost"]              += (prompt_tokens * tier.prompt_price + completion_tokens * tier.completion_price) / 1000
+
+    def view(self) -> str:
+        lines = [f"{'tier':<10} {'model':<22} {'calls':>6} {'fallbk':>6} {'429':>4} {'mean_s':>7} {'total_s':>8} {'tokens':>9} {'cost':>8}"]
+        for name, entry in self.report.items():
+            if not entry["calls"] and not entry["rate_limits"]:
+                continue
+            lines.append(f"{name:<10} {self.tiers[name].model:<22} {entry['calls']:>6} {entry['fallbacks']:>6} "
+                         f"{entry['rate_limits']:>4} {self.mean_latency(name):>7.2f} {entry['latency_s']:>8.1f} "
+                         f"{entry['prompt_tokens'] + entry['completion_tokens']:>9} {entry['cost']:>8.3f}")
+        return '\n'.join(lines)
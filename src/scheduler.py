@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+
+class RateLimiter:
+    # token bucket over requests per minute and tokens per minute shared by all workers
+    def __init__(self, requests_per_minute: float = 60, tokens_per_minute: float = 150_000):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute   = tokens_per_minute
+        self._requests  = float(requests_per_minute)
+        self._tokens    = float(tokens_per_minute)
+        self._last      = time.monotonic()
+        self._lock      = threading.Lock()
+        self.waited     = 0.0
+
+    def _refill(self):
+        now             = time.monotonic()
+        elapsed         = (now - self._last) / 60.0
+        self._last      = now
+        self._requests  = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute)
+        self._tokens    = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute)
+
+    def acquire(self, tokens: int = 0) -> float:
+        # a single request larger than the bucket is admitted once the bucket is full
+        tokens = min(tokens, self.tokens_per_minute)
+        start  = time.monotonic()
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens   -= tokens
+                    waited          = time.monotonic() - start
+                    self.waited    += waited
+                    return waited
+                missing = max((1 - self._requests) / self.requests_per_minute,
+                              (tokens - self._tokens) / self.tokens_per_minute) * 60.0
+            time.sleep(min(max(missing, 0.01), 1.0))
+
+
+def is_rate_limit(error: Exception) -> bool:
+    # only an HTTP 429 status or the client's rate limit exception type; messages are not matched,
+    # since e.g. context length errors quote token counts like `14290`
+    while error is not None:
+        status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+        if status == 429 or any(cls.__name__ == 'RateLimitError' for cls in type(error).__mro__):
+            return True
+        # engines may re-raise client errors wrapped in their own exceptions
+        error = error.__cause__
+    return False
+
+
+def retry(func: Callable[[], Any], retries: int = 5, backoff: float = 1.0, max_backoff: float = 60.0,
+          on_retry: Optional[Callable[[int, Exception], None]] = None) -> Any:
+    # exponential backoff with jitter on rate limit errors; other errors propagate immediately
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == retries or not is_rate_limit(e):
+                raise
+            if on_retry is not None:
+                on_retry(attempt, e)
+            time.sleep(min(backoff * 2 ** attempt, max_backoff) * (0.5 + random.random() / 2))
+
+
+def node_types(node) -> Set[type]:
+    types = {type(node)}
+    for child in getattr(node, 'children', []):
+        types |= node_types(child)
+    return types
+
+
+def adapted_types(node) -> Set[type]:
+    types = set(getattr(node, 'adapts', []))
+    for child in getattr(node, 'children', []):
+        types |= adapted_types(child)
+    return types
+
+
+def dependencies(nodes: List[Any]) -> Dict[int, Set[int]]:
+    # i -> j if node i adapts the dynamic context of a type used by node j,
+    # or if node j summarizes the body (`needs_body`) and node i is part of it
+    deps = {j: set() for j in range(len(nodes))}
+    for i, src in enumerate(nodes):
+        adapts = adapted_types(src)
+        for j, dst in enumerate(nodes):
+            if i == j:
+                continue
+            if any(issubclass(t, a) for t in node_types(dst) for a in adapts):
+                deps[j].add(i)
+            if getattr(dst, 'needs_body', False) and getattr(src, 'body', False):
+                deps[j].add(i)
+    return deps
+
+
+def phases(deps: Dict[int, Set[int]]) -> List[List[int]]:
+    level    = {}
+    visiting = set()
+    def depth(j):
+        if j not in level:
+            assert j not in visiting, f"Cyclic dependencies between nodes: {deps}."
+            visiting.add(j)
+            level[j] = 1 + max([depth(i) for i in deps[j]], default=-1)
+        return level[j]
+    for j in deps:
+        depth(j)
+    return [[j for j in deps if level[j] == l] for l in range(max(level.values(), default=-1) + 1)]
+
+
+class Scheduler:
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.timings: Dict[int, tuple] = {}
+        self.submitted: Dict[int, float] = {}
+        self.deps: Dict[int, Set[int]] = {}
+        self.phases: List[List[int]]  = []
+
+    def __call__(self, nodes: List[Any], run: Callable[[int, List[Any]], Any],
+                 deps: Optional[Dict[int, Set[int]]] = None) -> List[Any]:
+        results = [None] * len(nodes)
+        for j, res in self.stream(nodes, run, deps):
+            results[j] = res
+        return results
+
+    def stream(self, nodes: List[Any], run: Callable[[int, List[Any]], Any],
+               deps: Optional[Dict[int, Set[int]]] = None) -> Iterator[Tuple[int, Any]]:
+        # `run(j, results)` executes node j once all its dependencies have results;
+        # yields `(j, result)` in completion order
+        deps           = dependencies(nodes) if deps is None else deps
+        self.deps      = deps
+        self.phases    = phases(deps)
+        self.timings   = {}
+        self.submitted = {}
+        results        = [None] * len(nodes)
+        done           = set()
+        pending        = {}
+
+        def execute(j):
+            start = time.monotonic()
+            res   = run(j, results)
+            self.timings[j] = (start, time.monotonic())
+            return res
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(done) < len(nodes):
+                for j in deps:
+                    if j not in done and j not in pending.values() and deps[j] <= done:
+                        self.submitted[j] = time.monotonic()
+                        pending[pool.submit(execute, j)] = j
+                assert pending, f"Cyclic dependencies between nodes: {deps}."
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    j          = pending.pop(future)
+                    results[j] = future.result()
+                    done.add(j)
+                    yield j, results[j]
+
+    def report(self, nodes: List[Any]) -> List[dict]:
+        report = []
+        for level, phase in enumerate(self.phases):
+            spans = [self.timings[j] for j in phase if j in self.timings]
+            if not spans:
+                continue
+            report.append({
+                "phase": level,
+                "nodes": [type(nodes[j]).__name__ for j in phase],
+                "wall_time": max(end for _, end in spans) - min(start for start, _ in spans),
+            })
+        return report
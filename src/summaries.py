@@ -0,0 +1,115 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from files import write_atomic
+
+
+DEFAULT_SUMMARY_PATH = (Path(__file__).parent.absolute() / "tmp" / "summaries" / "index.json").as_posix()
+# the head of a cited paper (abstract, introduction, method) is enough for a base summary
+SOURCE_TOKENS        = 6000
+
+
+class SummaryIndex:
+    # paper-independent summaries of cited papers keyed by bib key and source hash
+    def __init__(self, path: str = DEFAULT_SUMMARY_PATH):
+        self.path    = path
+        self.entries: Dict[str, dict] = {}
+        self._lock   = threading.Lock()
+        if Path(path).exists():
+            with open(path, 'r') as file:
+                self.entries = json.load(file)
+
+    def get(self, key: str, source_hash: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        return entry['summary'] if entry is not None and entry['source'] == source_hash else None
+
+    def put(self, key: str, source_hash: str, stamp: list, summary: str):
+        with self._lock:
+            self.entries[key] = {'source': source_hash, 'stamp': stamp, 'summary': summary, 'created': time.time()}
+
+    def save(self):
+        with self._lock:
+            write_atomic(self.path, json.dumps(self.entries, indent=2))
+
+
+def precompute(papers_dir: str,
+               index: SummaryIndex,
+               read: Callable[[str], str],
+               summarize: Callable[[str, str], str],
+               workers: int = 8) -> dict:
+    # incremental: files with an unchanged stamp are skipped without reading, changed ones are
+    # re-read and only re-summarized when their content hash differs
+    files   = {path.stem: path for path in sorted(Path(papers_dir).glob("*.txt"))}
+    stats   = {"total": len(files), "reused": 0, "built": 0, "removed": 0, "failed": 0}
+    for key in set(index.entries) - set(files):
+        del index.entries[key]
+        stats["removed"] += 1
+    todo    = []
+    for key, path in files.items():
+        stat  = path.stat()
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        entry = index.entries.get(key)
+        if entry is not None and entry['stamp'] == stamp:
+            stats["reused"] += 1
+            continue
+        text  = read(path.as_posix())
+        source_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if entry is not None and entry['source'] == source_hash:
+            index.put(key, source_hash, stamp, entry['summary'])
+            stats["reused"] += 1
+            continue
+        todo.append((key, text, source_hash, stamp))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(summarize, key, text): (key, source_hash, stamp) for key, text, source_hash, stamp in todo}
+        for n, future in enumerate(as_completed(futures), start=1):
+            key, source_hash, stamp = futures[future]
+            try:
+                index.put(key, source_hash, stamp, future.result())
+                stats["built"] += 1
+            except Exception as e:
+                print(f"Failed to summarize {key}: {e}")
+                stats["failed"] += 1
+            # persist regularly so that an interrupted run resumes where it stopped
+            if n % 20 == 0:
+                index.save()
+    index.save()
+    return stats
+
+
+if __name__ == "__main__":
+    from symai import Symbol
+
+    from budget import compress
+    from cache import DEFAULT_CACHE_PATH, ResponseCache
+    from components import DEFAULT_BIB_PATH, DEFAULT_PAPERS_DIR, CitationSummary, Context, Source
+    from bibliography import Bibliography
+    from scheduler import RateLimiter
+
+    parser = argparse.ArgumentParser(description="Precompute paper-independent summaries of the related work corpus.")
+    parser.add_argument("--papers-dir", default=DEFAULT_PAPERS_DIR, help="Directory with the cited papers as `<bib key>.txt`.")
+    parser.add_argument("--bib-path", default=DEFAULT_BIB_PATH, help="Bibliography providing the entry of every cited paper.")
+    parser.add_argument("--index", default=DEFAULT_SUMMARY_PATH, help="Location of the summary index.")
+    parser.add_argument("--workers", type=int, default=8, help="Papers summarized concurrently.")
+    parser.add_argument("--rpm", type=float, default=60, help="Maximum model requests per minute.")
+    parser.add_argument("--tpm", type=float, default=150_000, help="Maximum model tokens per minute.")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="Location of the response cache database.")
+    args = parser.parse_args()
+
+    Context.cache   = ResponseCache(args.cache_path)
+    Context.limiter = RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    bibliography    = Bibliography.load(args.bib_path)
+
+    def summarize(key: str, text: str) -> str:
+        task = f"[PAPER::{key}]: <<<\n{compress(text, SOURCE_TOKENS)}\n>>>\n[BIBLIOGRAPHY::{key}]: <<<\n{bibliography.get(key)}\n>>>\n"
+        return str(CitationSummary()(Symbol(task)))
+
+    index = SummaryIndex(args.index)
+    stats = precompute(args.papers_dir, index, lambda path: str(Source.reader(path)), summarize, workers=args.workers)
+    print(f"Summary index: {stats}")
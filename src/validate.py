@@ -0,0 +1,122 @@
+import re
+from dataclasses import dataclass, field
+from typing import Collection, List, Set, Tuple
+
+
+# structure commands the prompts allow (`PAPER_STATIC_CONTEXT`), plus harmless text macros
+BASE_COMMANDS  = {'section', 'subsection', 'paragraph', 'texttt', 'textbf', 'emph', 'cite', 'citep', 'citet',
+                  'begin', 'end', 'ldots', 'dots', 'LaTeX', 'TeX'}
+FORBIDDEN      = {'documentclass', 'usepackage'}
+MATH_ENVS      = {'equation', 'equation*', 'align', 'align*', 'math', 'displaymath'}
+# content is not checked against the command whitelist; verbatim content is skipped entirely
+CODE_ENVS      = {'algorithmic'}
+VERBATIM_ENVS  = {'lstlisting', 'verbatim'}
+TOKEN_PATTERN  = re.compile(r"%[^\n]*|\\begin\s*\{([^}]*)\}|\\end\s*\{([^}]*)\}|\\([A-Za-z@]+)\*?|\\[()\[\]]|\\.|\$\$?|[{}]")
+HEADING_PATTERN = re.compile(r"\\(section|subsection)\*?\s*\{([^}]*)\}")
+
+
+@dataclass
+class LatexRules:
+    # per-section additions to the base whitelist
+    commands: Set[str]     = field(default_factory=set)
+    environments: Set[str] = field(default_factory=set)
+
+
+def line_of(text: str, pos: int) -> int:
+    return text.count('\n', 0, pos) + 1
+
+
+def headings(text: str) -> List[Tuple[str, str]]:
+    # `(command, name)` of the section and subsection headings, names compared case-insensitively
+    return [(match.group(1), match.group(2).strip().lower()) for match in HEADING_PATTERN.finditer(text)]
+
+
+def validate_latex(text: str, rules: LatexRules = LatexRules(), existing: Collection[Tuple[str, str]] = ()) -> List[str]:
+    # structural checks of one generated section; returns human readable errors for the model.
+    # `existing` holds the headings other sections of the document already use
+    errors   = []
+    commands = BASE_COMMANDS | rules.commands
+    envs     = MATH_ENVS | CODE_ENVS | VERBATIM_ENVS | rules.environments
+    stack    = []
+    braces   = []
+    math     = None
+    pos      = 0
+    while True:
+        match = TOKEN_PATTERN.search(text, pos)
+        if match is None:
+            break
+        token, pos = match.group(0), match.end()
+        begin, end, name = match.group(1), match.group(2), match.group(3)
+        if token.startswith('%'):
+            continue
+        if begin is not None:
+            begin = begin.strip()
+            if begin == 'document':
+                errors.append(f"line {line_of(text, match.start())}: `\\begin{{document}}` is provided by the template.")
+            elif begin not in envs:
+                errors.append(f"line {line_of(text, match.start())}: environment `{begin}` is not allowed.")
+            if begin in VERBATIM_ENVS:
+                close = re.compile(r"\\end\s*\{" + re.escape(begin) + r"\}").search(text, pos)
+                if close is None:
+                    errors.append(f"line {line_of(text, match.start())}: `\\begin{{{begin}}}` is never closed.")
+                    break
+                pos = close.end()
+                continue
+            if begin != 'document':
+                stack.append((begin, match.start()))
+        elif end is not None:
+            end = end.strip()
+            if end == 'document':
+                errors.append(f"line {line_of(text, match.start())}: `\\end{{document}}` is provided by the template.")
+                continue
+            if not stack:
+                errors.append(f"line {line_of(text, match.start())}: `\\end{{{end}}}` without matching `\\begin`.")
+            elif stack[-1][0] != end:
+                errors.append(f"line {line_of(text, match.start())}: `\\end{{{end}}}` closes `\\begin{{{stack[-1][0]}}}` "
+                              f"from line {line_of(text, stack[-1][1])}.")
+                stack.pop()
+            else:
+                stack.pop()
+        elif token in ('$', '$$', '\\(', '\\[', '\\)', '\\]'):
+            opening = {'\\)': '\\(', '\\]': '\\['}.get(token, token)
+            if math is None and token not in ('\\)', '\\]'):
+                math = (token, match.start())
+            elif math is not None and math[0] == opening:
+                math = None
+            else:
+                errors.append(f"line {line_of(text, match.start())}: unbalanced math delimiter `{token}`.")
+        elif token == '{':
+            braces.append(match.start())
+        elif token == '}':
+            if braces:
+                braces.pop()
+            else:
+                errors.append(f"line {line_of(text, match.start())}: unmatched `}}`.")
+        elif name is not None:
+            in_math = math is not None or any(env in MATH_ENVS for env, _ in stack)
+            in_code = any(env in CODE_ENVS for env, _ in stack)
+            if name in FORBIDDEN:
+                errors.append(f"line {line_of(text, match.start())}: `\\{name}` belongs to the template preamble.")
+            elif not in_math and not in_code and name not in commands:
+                errors.append(f"line {line_of(text, match.start())}: command `\\{name}` is not allowed here.")
+
+    for env, start in stack:
+        errors.append(f"line {line_of(text, start)}: `\\begin{{{env}}}` is never closed.")
+    for start in braces:
+        errors.append(f"line {line_of(text, start)}: unmatched `{{`.")
+    if math is not None:
+        errors.append(f"line {line_of(text, math[1])}: math started with `{math[0]}` is never closed.")
+
+    seen = {}
+    for match in HEADING_PATTERN.finditer(text):
+        heading = (match.group(1), match.group(2).strip().lower())
+        if heading in existing:
+            errors.append(f"line {line_of(text, match.start())}: \\{match.group(1)} `{match.group(2).strip()}` "
+                          f"already exists in the document; use another name or leave it out.")
+        elif heading in seen:
+            errors.append(f"line {line_of(text, match.start())}: duplicated \\{match.group(1)} `{match.group(2).strip()}` "
+                          f"(first on line {seen[heading]}).")
+        seen.setdefault(heading, line_of(text, match.start()))
+    for match in re.finditer(r"\\paragraph\s*\{\s*\}", text):
+        errors.append(f"line {line_of(text, match.start())}: `\\paragraph` needs a name.")
+    return errors
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the modules live flat in `src/` and import each other by name
+sys.path.insert(0, (Path(__file__).parent.parent / "src").as_posix())
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+import pytest
+
+from bench import IMPORT_BUDGET_MS, SRC_DIR, failures, import_times, regressions
+
+
+def test_crashed_results_fail_the_check():
+    results = [{"scenario": "small", "end_to_end_s": 1.0},
+               {"scenario": "medium", "error": "AssertionError: No engine for model None."}]
+    assert failures(results, []) == [results[1]]
+    assert failures(results[:1], []) == []
+
+
+def test_budgets_and_regressions_fail_the_check():
+    baseline  = {"import_time": [{"module": "components", "budgeted_ms": 10.0}]}
+    results   = [{"module": "components", "budgeted_ms": 40.0, "within_budget": True}]
+    regressed = regressions("import_time", results, baseline)
+    assert regressed == [{"module": "components", "measurement": "budgeted_ms", "baseline": 10.0, "value": 40.0}]
+    assert failures(results, regressed) == regressed
+    assert failures([{"module": "components", "within_budget": False}], []) != []
+
+
+def test_import_times_exclude_only_the_outermost_symai_imports():
+    log = """import time:       100 |        100 |     symai.core
+import time:       200 |        300 |   symai
+import time:        10 |         10 |     retrieval
+import time:        50 |         60 |   budget
+import time:        40 |        400 | components
+import time:         5 |          5 | symai.unrelated"""
+    assert import_times(log, "components") == (400, 300)
+
+
+def test_components_import_within_budget():
+    pytest.importorskip("symai")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import components"],
+                          cwd=SRC_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr.strip().splitlines()[-1]
+    total, skipped = import_times(proc.stderr, "components")
+    assert (total - skipped) / 1000 <= IMPORT_BUDGET_MS
@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+from bibliography import Bibliography
+
+
+BIB = """@comment{ignored}
+@article{First:23,
+title={First}
+}
+@inproceedings{ Second:24 , title={Second}}
+"""
+
+
+@pytest.fixture
+def bib(tmp_path):
+    Bibliography._instances.clear()
+    path = tmp_path / "references.bib"
+    path.write_text(BIB)
+    yield path
+    Bibliography._instances.clear()
+
+
+def counting_parse(monkeypatch):
+    calls = []
+    parse = Bibliography.parse
+    def counted(text):
+        calls.append(text)
+        return parse(text)
+    monkeypatch.setattr(Bibliography, 'parse', staticmethod(counted))
+    return calls
+
+
+def test_parse_keys_entries_and_skips_comments():
+    entries = Bibliography.parse(BIB)
+    assert list(entries) == ["First:23", "Second:24"]
+    assert entries["First:23"] == "@article{First:23,\ntitle={First}\n}"
+
+
+def test_index_is_json_and_reused(bib, tmp_path, monkeypatch):
+    index = tmp_path / "index"
+    assert len(Bibliography(bib.as_posix(), index_dir=index.as_posix())) == 2
+    [path] = index.iterdir()
+    assert path.suffix == ".json" and set(json.loads(path.read_text())["entries"]) == {"First:23", "Second:24"}
+    calls = counting_parse(monkeypatch)
+    assert "Second:24" in Bibliography(bib.as_posix(), index_dir=index.as_posix())
+    assert calls == []
+
+
+def test_touched_file_keeps_its_parsed_entries(bib, tmp_path, monkeypatch):
+    index = tmp_path / "index"
+    Bibliography(bib.as_posix(), index_dir=index.as_posix()).keys()
+    stat  = os.stat(bib)
+    os.utime(bib, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    calls = counting_parse(monkeypatch)
+    assert len(Bibliography(bib.as_posix(), index_dir=index.as_posix())) == 2
+    assert calls == []
+
+
+def test_load_picks_up_changes_and_keeps_added_entries(bib, tmp_path):
+    index = (tmp_path / "index").as_posix()
+    first = Bibliography.load(bib.as_posix(), index_dir=index)
+    assert "Third:25" not in first
+    first.add("Runtime:25", "@misc{Runtime:25}")
+    bib.write_text(BIB + "@misc{Third:25, title={Third}}\n")
+    again = Bibliography.load(bib.as_posix(), index_dir=index)
+    assert again is first
+    assert "Third:25" in again and again.get("Runtime:25") == "@misc{Runtime:25}"
@@ -0,0 +1,52 @@
+import os
+import time
+
+from blobs import BlobStore, BlobText
+
+
+def test_mapped_and_heap_blobs_round_trip(tmp_path):
+    store = BlobStore(tmp_path.as_posix(), mmap_threshold=64)
+    small = store.put("short text")
+    large = store.put("größer " * 100)
+    assert store.stats()["mapped"] == 1
+    assert store.get(small) == "short text"
+    assert store.get(large) == "größer " * 100
+    assert bytes(store.view(large)) == ("größer " * 100).encode('utf-8')
+    assert store.put("größer " * 100) == large and store.interned == 1
+
+
+def test_blob_text_length_without_joining(tmp_path):
+    store  = BlobStore(tmp_path.as_posix(), mmap_threshold=64)
+    blob   = store.put("größer " * 100)
+    record = BlobText(store, ["[PAPER]: <<<\n", (blob,), "\n>>>\n"])
+    assert len(record) == len(str(record))
+    assert str(record) == "[PAPER]: <<<\n" + "größer " * 100 + "\n>>>\n"
+
+
+def test_decoded_blobs_and_records_are_shared(tmp_path):
+    store  = BlobStore(tmp_path.as_posix(), mmap_threshold=64, decoded_chars=2_000)
+    blob   = store.put("mapped " * 100)
+    assert store.get(blob) is store.get(blob)
+    first  = BlobText(store, ["head\n", (blob,)])
+    second = BlobText(store, ["head\n", (blob,)])
+    assert str(first) is str(second)
+    # the LRU drops the least recently used strings beyond `decoded_chars`
+    other  = store.put("other " * 300)
+    store.get(other)
+    assert store.stats()["decoded_chars"] <= 2_000
+    assert store.get(other) == "other " * 300
+
+
+def test_unused_blob_files_are_evicted(tmp_path):
+    store = BlobStore(tmp_path.as_posix(), mmap_threshold=64, max_bytes=1_000, max_age=60)
+    old   = store.put("old " * 100)
+    # an old file expires; files beyond `max_bytes` go least recently used first
+    os.utime(tmp_path / f"{old}.blob", (time.time() - 120, time.time() - 120))
+    newer = store.put("newer " * 100)
+    assert not (tmp_path / f"{old}.blob").exists()
+    assert store.get(old) == "old " * 100
+    newest = store.put("newest " * 100)
+    assert not (tmp_path / f"{newer}.blob").exists() and (tmp_path / f"{newest}.blob").exists()
+    # a later process remaps an evicted blob by writing it again
+    again = BlobStore(tmp_path.as_posix(), mmap_threshold=64)
+    assert again.get(again.put("newer " * 100)) == "newer " * 100
@@ -0,0 +1,60 @@
+from budget import ELLIPSIS, ContextBudget, allocate, compress
+from retrieval import count_tokens
+
+
+def test_allocate_keeps_small_parts_whole():
+    assert allocate([10, 100, 100], 110) == [10, 50, 50]
+    assert allocate([10, 20], 100) == [10, 20]
+    assert allocate([10, 20], -5) == [0, 0]
+
+
+def test_allocate_serves_higher_priorities_first():
+    assert allocate([100, 100, 100], 150, priorities=[0, 1, 0]) == [25, 100, 25]
+    assert allocate([100, 100], 80, priorities=[2, 1]) == [80, 0]
+
+
+def test_compress_keeps_leading_sentences():
+    text = "First sentence here. Second sentence here. Third sentence here."
+    assert compress(text, 100) == text
+    assert compress(text, 12) == "First sentence here. Second sentence here." + ELLIPSIS
+    assert compress("x" * 400, 10).endswith(ELLIPSIS)
+    assert count_tokens(compress("x" * 400, 10)) <= 10
+
+
+def test_compress_keeps_trailing_citations():
+    summary = ("The cited paper proposes a neuro-symbolic engine. It evaluates it on many benchmarks. "
+               "The results improve over prior work. \\citep{Newell:56}")
+    compressed = compress(summary, 20)
+    assert compressed.startswith("The cited paper proposes a neuro-symbolic engine.")
+    assert compressed.endswith("\\citep{Newell:56}")
+    # a cut inside the first sentence never leaves a citation fragment
+    cut = compress("a" * 30 + " \\citep{Laird:87} and more words without a sentence end", 15)
+    assert cut.count("\\cite") == 1 and cut.endswith("\\citep{Laird:87}")
+
+
+def test_fit_compresses_adapted_contexts_before_the_task():
+    budget  = ContextBudget({"Abstract": 60})
+    static  = "static " * 20
+    dynamic = ["Adapted summary sentence. " * 10]
+    task    = ["Body text."]
+    fitted, fitted_task = budget.fit("Abstract", static, dynamic, task)
+    assert fitted_task == task
+    assert fitted[0].endswith(ELLIPSIS)
+    assert count_tokens(static) + count_tokens(fitted[0]) + count_tokens(task[0]) <= 60
+    entry = budget.report["Abstract"]
+    assert entry["calls"] == 1 and entry["after"]["static"] == entry["before"]["static"]
+    assert entry["saved_tokens"] == entry["before"]["dynamic"] - entry["after"]["dynamic"]
+
+
+def test_fit_ranks_adapted_contexts_by_priority():
+    budget  = ContextBudget(default=60, priorities={"Method": 1})
+    dynamic = ["Method summary sentence. " * 8, "Other context sentence. " * 8]
+    fitted, _ = budget.fit("Title", "", dynamic, ["Body."], sources=["Method", "Algorithm"])
+    assert fitted[0] == dynamic[0]
+    assert fitted[1].endswith(ELLIPSIS)
+
+
+def test_fit_leaves_prompts_within_budget_unchanged():
+    budget = ContextBudget()
+    assert budget.fit("Method", "static", ["dynamic"], ["task"]) == (["dynamic"], ["task"])
+    assert budget.report["Method"]["saved_tokens"] == 0
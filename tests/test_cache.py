@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache((tmp_path / "responses.db").as_posix())
+
+
+def test_hit_skips_computation(cache):
+    calls = []
+    compute = lambda: calls.append(1) or "completion"
+    assert cache("key", compute, section="Method") == "completion"
+    assert cache("key", compute, section="Method") == "completion"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_refresh_recomputes_and_updates(tmp_path):
+    path = (tmp_path / "responses.db").as_posix()
+    ResponseCache(path)("key", lambda: "old", section="Method")
+    refreshed = ResponseCache(path, refresh=["Method"])
+    assert refreshed("key", lambda: "new", section="Method") == "new"
+    # other section types are still served from the cache
+    assert refreshed("other", lambda: "other", section="Title") == "other"
+    assert refreshed("other", lambda: "recomputed", section="Title") == "other"
+    assert ResponseCache(path)("key", lambda: "unused", section="Method") == "new"
+
+
+def test_disabled_cache_neither_reads_nor_writes(cache):
+    cache("key", lambda: "cached")
+    cache.enabled = False
+    assert cache("key", lambda: "fresh") == "fresh"
+    cache.enabled = True
+    assert cache("key", lambda: "unused") == "cached"
+
+
+def test_expired_entries_are_recomputed_and_evicted(cache):
+    cache.max_age = 60
+    cache("key", lambda: "stale")
+    cache.conn.execute("UPDATE responses SET created = ?", (time.time() - 120,))
+    assert cache.get("key") is None
+    cache.evict()
+    assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+    assert cache("key", lambda: "fresh") == "fresh"
+
+
+def test_size_limit_evicts_least_recently_used(cache):
+    cache.max_bytes = 250
+    cache("a", lambda: "a" * 100)
+    cache("b", lambda: "b" * 100)
+    # touching `a` makes `b` the least recently used entry
+    cache.conn.execute("UPDATE responses SET accessed = accessed - 10 WHERE key = 'b'")
+    cache("c", lambda: "c" * 100)
+    keys = {row[0] for row in cache.conn.execute("SELECT key FROM responses")}
+    assert keys == {"a", "c"}
+
+
+def test_entry_limit(cache):
+    cache.max_entries = 2
+    for key in "abc":
+        cache(key, lambda: key)
+        time.sleep(0.01)
+    assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 2
+    assert cache.get("a") is None
+
+
+def test_sections_are_served_offline_by_the_replay_engine(tmp_path):
+    pytest.importorskip("symai")
+    from components import Conclusion, Context, Paper
+    from engines import ReplayEngine
+
+    engine   = ReplayEngine(["```latex\n\\section{Conclusion}\nReplayed.\n```"]).install()
+    previous = Context.cache, Paper.context
+    Context.cache = ResponseCache((tmp_path / "responses.db").as_posix())
+    Paper.context = "[Global Context]\nOffline test paper."
+    try:
+        first  = str(Conclusion()("Write the conclusion."))
+        second = str(Conclusion()("Write the conclusion."))
+        assert first == second and engine.calls == 1
+        assert Context.cache.stats()["hits"] == 1
+        Context.cache.refresh = {"Conclusion"}
+        Conclusion()("Write the conclusion.")
+        assert engine.calls == 2
+    finally:
+        Context.cache, Paper.context = previous
+
+
+def test_rejected_values_are_returned_but_not_stored(cache):
+    assert cache("key", lambda: "invalid", cacheable=lambda value: value != "invalid") == "invalid"
+    assert cache("key", lambda: "valid", cacheable=lambda value: value != "invalid") == "valid"
+    assert cache("key", lambda: "unused") == "valid"
+    assert cache.stats()["writes"] == 1
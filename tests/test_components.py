@@ -0,0 +1,133 @@
+import pytest
+
+pytest.importorskip("symai")
+
+from symai import Symbol
+
+from components import Abstract, Conclusion, Context, Method, Paper, Source
+from engines import ReplayEngine
+from routing import ModelRouter
+
+
+@pytest.fixture
+def offline(tmp_path):
+    previous = Context.cache, Context.limiter
+    Context.cache, Context.limiter = None, None
+    Source.loads.clear()
+    yield tmp_path
+    Context.cache, Context.limiter = previous
+
+
+def test_file_source_parses_its_bibliography(offline):
+    engine = ReplayEngine(["@article{Offline:24, title={An offline source}, year={2024}}"]).install()
+    bib    = offline / "references.bib"
+    bib.write_text("@article{Other:23,\ntitle={Other}\n}\n")
+    paper  = offline / "source.txt"
+    paper.write_text("An offline source.\n\nIt describes a method.")
+    source = Source(file_link=paper.as_posix(), bib_path=bib.as_posix())
+    # construction and planning make no model calls
+    source.inputs()
+    assert engine.calls == 0
+    source.resolve()
+    assert source.bib_value == "Offline:24"
+    assert engine.calls == 1
+
+
+def test_edited_file_sources_are_read_again(offline):
+    paper  = offline / "source.txt"
+    paper.write_text("An offline source.")
+    before = Source(file_link=paper.as_posix(), bib_path=(offline / "references.bib").as_posix())
+    paper.write_text("An offline source, edited.")
+    after  = Source(file_link=paper.as_posix(), bib_path=(offline / "references.bib").as_posix())
+    assert after.content_hash != before.content_hash
+    assert Source.blobs.get(after.content_hash) == "An offline source, edited."
+
+
+def test_inputs_fingerprint_retrieval_settings(offline):
+    ReplayEngine(["@article{Offline:24, title={An offline source}, year={2024}}"]).install()
+    paper = offline / "source.txt"
+    paper.write_text("An offline source.")
+    Paper.context = "[Global Context]\nOffline test paper."
+    method = Method(Source(file_link=paper.as_posix(), bib_path=(offline / "references.bib").as_posix()))
+    before = method.inputs()
+    budget = Source.token_budget
+    try:
+        Source.token_budget = 1000
+        assert method.inputs() != before
+    finally:
+        Source.token_budget, Paper.context = budget, None
+
+
+def test_adapted_context_reaches_downstream_sections(offline):
+    engine = ReplayEngine(["@article{Offline:24, title={An offline source}, year={2024}}",
+                           "ADAPTED METHOD SUMMARY",
+                           "\\section{Method}\nThe method.",
+                           "\\begin{abstract}An abstract.\\end{abstract}",
+                           "\\section{Conclusion}\nThe conclusion."]).install()
+    source = offline / "source.txt"
+    source.write_text("An offline source.")
+    repairs, Context.max_repairs = Context.max_repairs, 0
+    try:
+        paper = Paper(Method(Source(file_link=source.as_posix(), bib_path=(offline / "references.bib").as_posix())),
+                      Abstract(),
+                      context="[Global Context]\nOffline test paper.")
+        paper(Symbol("Write the paper."))
+    finally:
+        Context.max_repairs = repairs
+    abstract = [prompt for prompt in engine.prompts if "Write the paper abstract" in prompt]
+    assert abstract and "ADAPTED METHOD SUMMARY" in abstract[0]
+
+
+def test_stream_fills_placeholders_as_sections_complete(offline):
+    ReplayEngine(["Generated."]).install()
+    repairs, Context.max_repairs = Context.max_repairs, 0
+    try:
+        paper    = Paper(Abstract(), context="[Global Context]\nOffline test paper.")
+        streamed = [(node_id, str(paper.assemble(results, lambda node: f"PENDING {type(node).__name__}").value))
+                    for node_id, results in paper.stream(Symbol("Write the paper."))]
+    finally:
+        Context.max_repairs = repairs
+    assert sorted(node_id for node_id, _ in streamed) == sorted(paper.node_id(j) for j in range(len(paper.sections)))
+    # every section is a placeholder until it completes, and none is left at the end
+    assert "PENDING" in streamed[0][1] and "Generated." in streamed[0][1]
+    assert "PENDING" not in streamed[-1][1]
+
+
+def test_invoke_retries_on_the_fallback_tier(offline):
+    class RateLimitError(Exception):
+        status_code = 429
+
+    calls = []
+    def engine(model, max_tokens):
+        calls.append(model)
+        if model == "gpt-4":
+            raise RateLimitError("Too Many Requests")
+        return model
+    previous, Context.router = Context.router, ModelRouter()
+    try:
+        assert Context.invoke(engine, section="Method") == "gpt-4-turbo"
+        assert calls == ["gpt-4", "gpt-4-turbo"]
+        assert Context.router.report["strong"]["rate_limits"] == 1
+        assert Context.router.report["standard"]["fallbacks"] == 1
+    finally:
+        Context.router = previous
+
+
+def test_invalid_sections_are_repaired_with_their_errors(offline):
+    engine = ReplayEngine(["\\section{Conclusion}\n\\begin{itemize}\n\\item one\n\\end{itemize}",
+                           "\\section{Conclusion}\nRepaired."]).install()
+    paper  = Paper(context="[Global Context]\nOffline test paper.")
+    res    = paper.conclusion(Symbol("Write the conclusion."))
+    assert str(res) == "\\section{Conclusion}\nRepaired."
+    assert engine.calls == 2
+    assert "[Validation Errors]" in engine.prompts[1] and "environment `itemize` is not allowed" in engine.prompts[1]
+    assert paper.metrics.totals()["repairs"] == 1
+
+
+def test_headings_of_earlier_sections_are_not_repeated(offline):
+    engine = ReplayEngine(["\\section{Method}\nAgain.", "\\section{Conclusion}\nDone."]).install()
+    paper  = Paper(context="[Global Context]\nOffline test paper.")
+    paper.add_headings(object(), "\\section{Method}\nThe method.")
+    assert str(paper.conclusion(Symbol("Write the conclusion."))) == "\\section{Conclusion}\nDone."
+    assert "`Method` already exists in the document" in engine.prompts[1]
+    assert ("section", "conclusion") in paper.headings
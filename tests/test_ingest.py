@@ -0,0 +1,125 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ingest import Ingestor
+
+
+class Site:
+    # pages served by the stand-in server; the ETag follows the page version
+    def __init__(self, latency: float = 0.0):
+        self.latency   = latency
+        self.version   = 1
+        self.in_flight = 0
+        self.peak      = 0
+        self.statuses  = []
+        # close keep-alive connections after every response without announcing it
+        self.drop_idle = False
+        self.lock      = threading.Lock()
+
+    def body(self, path: str) -> bytes:
+        return (f"<html><body><p>Page {path} version {self.version}</p>"
+                f"<script>ignored()</script></body></html>").encode('utf-8')
+
+
+@pytest.fixture
+def site():
+    site = Site()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            with site.lock:
+                site.in_flight += 1
+                site.peak       = max(site.peak, site.in_flight)
+            try:
+                time.sleep(site.latency)
+                etag = f'"v{site.version}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    site.statuses.append(304)
+                    return
+                body = site.body(self.path)
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                site.statuses.append(200)
+                self.close_connection = site.drop_idle
+            finally:
+                with site.lock:
+                    site.in_flight -= 1
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    site.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+def test_revalidation_reuses_the_cached_body_and_text(site, tmp_path):
+    url     = f"{site.url}/paper"
+    text, _ = Ingestor(cache_dir=tmp_path.as_posix()).ingest(url)
+    assert text == "Page /paper version 1"
+    # a new process sends If-None-Match and keeps the cached body on 304
+    second = Ingestor(cache_dir=tmp_path.as_posix())
+    assert second.ingest(url) == (text, None)
+    assert site.statuses == [200, 304]
+    assert second.stats["not_modified"] == 1 and second.stats["downloaded"] == 0
+    assert second.stats["text_hits"] == 1
+
+
+def test_requests_in_flight_stay_within_the_per_host_limit(site, tmp_path):
+    site.latency = 0.05
+    ingestor = Ingestor(cache_dir=tmp_path.as_posix(), max_workers=12, max_per_host=3)
+    futures  = [ingestor.submit(f"{site.url}/paper{i}") for i in range(12)]
+    texts    = [future.result()[0] for future in futures]
+    assert texts == [f"Page /paper{i} version 1" for i in range(12)]
+    assert site.peak == 3
+    assert ingestor.stats["requests"] == 12
+
+
+def test_changed_body_invalidates_derived_text_and_bibtex(site, tmp_path):
+    url    = f"{site.url}/refs"
+    parsed = []
+
+    def parse(text):
+        parsed.append(text)
+        return [text.split()[-1]]
+
+    assert Ingestor(cache_dir=tmp_path.as_posix()).ingest(url, parse) == ("Page /refs version 1", ["1"])
+    unchanged = Ingestor(cache_dir=tmp_path.as_posix())
+    assert unchanged.ingest(url, parse) == ("Page /refs version 1", ["1"])
+    assert unchanged.stats["text_hits"] == 1 and unchanged.stats["bib_hits"] == 1
+    assert len(parsed) == 1
+    # the server's body changes: the 200 carries a new body hash, so neither derived entry is reused
+    site.version = 2
+    changed = Ingestor(cache_dir=tmp_path.as_posix())
+    assert changed.ingest(url, parse) == ("Page /refs version 2", ["2"])
+    assert changed.stats["downloaded"] == 1
+    assert changed.stats["text_hits"] == 0 and changed.stats["bib_hits"] == 0
+    assert parsed == ["Page /refs version 1", "Page /refs version 2"]
+
+
+def test_stale_keep_alive_connections_are_replaced(site, tmp_path):
+    site.drop_idle = True
+    ingestor = Ingestor(cache_dir=tmp_path.as_posix(), max_per_host=1)
+    assert ingestor.ingest(f"{site.url}/first")[0] == "Page /first version 1"
+    time.sleep(0.05)
+    # the idle connection was closed by the server; the request is retried once on a new one
+    assert ingestor.ingest(f"{site.url}/second")[0] == "Page /second version 1"
+    assert ingestor.stats["reconnects"] == 1 and ingestor.stats["requests"] == 2
@@ -0,0 +1,102 @@
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from latex import LatexCompiler
+
+
+# stand-ins for lualatex and bibtex: every call is appended to `calls.log`; the first pass after
+# bibtex picks up the bibliography, asks for a rerun, and the next pass is stable
+FAKE_LUALATEX = """#!{python}
+import os, sys, time
+from pathlib import Path
+name = Path(sys.argv[-1]).stem
+with open("calls.log", "a") as log:
+    log.write("lualatex\\n")
+time.sleep(float(os.environ.get("FAKE_LATEX_SLEEP", "0")))
+aux  = Path(f"{{name}}.aux")
+old  = aux.read_text() if aux.exists() else ""
+new  = "\\\\citation{{Newell:56}}\\n\\\\bibdata{{references}}\\n"
+if Path(f"{{name}}.bbl").exists():
+    new += "\\\\bibcite{{Newell:56}}{{1}}\\n"
+aux.write_text(new)
+rerun = "LaTeX Warning: Label(s) may have changed. Rerun to get cross-references right.\\n" if new != old and "bibcite" in new else ""
+Path(f"{{name}}.log").write_text("This is LuaTeX\\n" + rerun)
+Path(f"{{name}}.pdf").write_bytes(b"%PDF-1.4\\n")
+"""
+
+FAKE_BIBTEX = """#!{python}
+import os, sys
+from pathlib import Path
+name = sys.argv[-1]
+with open("calls.log", "a") as log:
+    log.write("bibtex\\n")
+if os.environ.get("FAKE_BIBTEX_FAIL"):
+    Path(f"{{name}}.blg").write_text("I couldn't open database file references.bib\\n---line 2 of file main.aux\\n")
+    sys.exit(2)
+Path(f"{{name}}.bbl").write_text("\\\\begin{{thebibliography}}{{1}}\\n\\\\end{{thebibliography}}\\n")
+"""
+
+
+@pytest.fixture
+def template(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, script in [("lualatex", FAKE_LUALATEX), ("bibtex", FAKE_BIBTEX)]:
+        path = bin_dir / name
+        path.write_text(script.format(python=sys.executable))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    work = tmp_path / "template"
+    work.mkdir()
+    (work / "main.tex").write_text("\\documentclass{article}\\begin{document}\\citep{Newell:56}\\end{document}\n")
+    (work / "references.bib").write_text("@article{Newell:56,\ntitle={Logic Theorist}\n}\n")
+    return work
+
+
+def calls(work: Path) -> list:
+    path = work / "calls.log"
+    calls = path.read_text().split() if path.exists() else []
+    path.unlink(missing_ok=True)
+    return calls
+
+
+def test_first_compile_runs_bibtex_between_passes(template):
+    result = LatexCompiler()("main", template)
+    assert calls(template) == ["lualatex", "bibtex", "lualatex", "lualatex"]
+    assert result.success and not result.bibtex_skipped
+    assert result.pass_count == 3
+
+
+def test_unchanged_rerun_is_one_pass_without_bibtex(template):
+    LatexCompiler()("main", template)
+    calls(template)
+    result = LatexCompiler()("main", template)
+    assert calls(template) == ["lualatex"]
+    assert result.success and result.bibtex_skipped
+
+
+def test_changed_bibliography_reruns_bibtex(template):
+    LatexCompiler()("main", template)
+    calls(template)
+    (template / "references.bib").write_text("@article{Newell:56,\ntitle={The Logic Theorist}\n}\n")
+    LatexCompiler()("main", template)
+    assert "bibtex" in calls(template)
+
+
+def test_timeout_is_reported(template, monkeypatch):
+    monkeypatch.setenv("FAKE_LATEX_SLEEP", "5")
+    result = LatexCompiler(timeout=0.5)("main", template)
+    assert not result.success
+    assert result.passes[-1].timed_out
+    assert any("timed out" in error for error in result.errors)
+
+
+def test_bibtex_errors_are_read_from_the_blg(template, monkeypatch):
+    monkeypatch.setenv("FAKE_BIBTEX_FAIL", "1")
+    result = LatexCompiler()("main", template)
+    assert not result.success
+    assert "bibtex: I couldn't open database file references.bib (line 2 of file main.aux)" in result.errors
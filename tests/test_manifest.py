@@ -0,0 +1,43 @@
+import json
+import threading
+
+from files import write_atomic
+from manifest import BuildManifest, fingerprint
+
+
+def test_concurrent_saves_of_one_manifest(tmp_path):
+    manifest = BuildManifest((tmp_path / "build" / "manifest.json").as_posix())
+    errors   = []
+
+    def build(worker):
+        try:
+            for n in range(50):
+                manifest.record(f"{worker}:{n}", fingerprint(worker, n), [], f"output {n}")
+                manifest.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(BuildManifest(manifest.path).entries) == 200
+    assert [p.name for p in (tmp_path / "build").iterdir()] == ["manifest.json"]
+
+
+def test_plan_reports_changed_inputs_and_upstream(tmp_path):
+    manifest = BuildManifest((tmp_path / "manifest.json").as_posix())
+    manifest.record("0:Method", "a", [], "method")
+    manifest.record("1:Abstract", "b", [fingerprint("method")], "abstract")
+    plan = manifest.plan({"0:Method": "changed", "1:Abstract": "b"}, {"0:Method": [], "1:Abstract": ["0:Method"]})
+    assert plan == [("0:Method", True, "inputs changed"), ("1:Abstract", True, "upstream rebuilt: 0:Method")]
+
+
+def test_write_atomic_text_and_bytes(tmp_path):
+    write_atomic(tmp_path / "nested" / "file.json", json.dumps({"a": 1}))
+    write_atomic(tmp_path / "nested" / "file.bin", b"\x00\x01")
+    assert json.loads((tmp_path / "nested" / "file.json").read_text()) == {"a": 1}
+    assert (tmp_path / "nested" / "file.bin").read_bytes() == b"\x00\x01"
+    assert sorted(p.name for p in (tmp_path / "nested").iterdir()) == ["file.bin", "file.json"]
@@ -0,0 +1,69 @@
+import json
+
+from metrics import RunMetrics
+
+
+class Node:
+    def __init__(self, *children):
+        self.children = list(children)
+
+
+class Method(Node):
+    pass
+
+
+class Source(Node):
+    pass
+
+
+class Abstract(Node):
+    pass
+
+
+def timed(metrics, name, start, end, **counters):
+    node = metrics.nodes[name]
+    node.start, node.end, node.wall_s = start, end, end - start
+    for key, value in counters.items():
+        setattr(node, key, value)
+
+
+def build():
+    # the abstract depends on the method, whose slower source lies on the critical path
+    fast, slow = Source(), Source()
+    nodes      = [Method(fast, slow), Abstract()]
+    metrics    = RunMetrics()
+    metrics.register(nodes)
+    timed(metrics, "0:Method", 0.0, 4.0, calls=1, prompt_tokens=100)
+    timed(metrics, "0:Method/0:Source", 0.0, 1.0, calls=1, cache_hits=1)
+    timed(metrics, "0:Method/1:Source", 0.0, 3.0, calls=1, prompt_tokens=50)
+    timed(metrics, "1:Abstract", 4.0, 6.0, calls=2, retries=1)
+    return metrics, {0: set(), 1: {0}}
+
+
+def test_critical_path_follows_dependencies_and_slowest_children():
+    metrics, deps = build()
+    assert metrics.critical_path(deps) == ["0:Method", "0:Method/1:Source", "1:Abstract"]
+    assert metrics.critical_path({0: set(), 1: set()}) == ["1:Abstract"]
+    assert RunMetrics().critical_path({}) == []
+
+
+def test_json_report_sums_counters_over_nodes(tmp_path):
+    metrics, deps = build()
+    metrics.save((tmp_path / "run.json").as_posix(), deps)
+    report = json.loads((tmp_path / "run.json").read_text())
+    assert report["totals"]["calls"] == 5 and report["totals"]["prompt_tokens"] == 150
+    assert report["totals"]["wall_s"] == 6.0
+    assert report["critical_path"] == metrics.critical_path(deps)
+    assert [node["node"] for node in report["nodes"]] == list(metrics.nodes)
+    assert (tmp_path / "run.prom").read_text() == metrics.prometheus()
+
+
+def test_prometheus_exports_counters_with_total_suffix():
+    metrics, _ = build()
+    lines      = metrics.prometheus().splitlines()
+    assert "# TYPE paper_node_calls_total counter" in lines
+    assert 'paper_node_calls_total{node="1:Abstract",type="Abstract"} 2' in lines
+    assert "# TYPE paper_run_retries_total counter" in lines and "paper_run_retries_total 1" in lines
+    # the run's wall time is elapsed time, not a sum
+    assert "# TYPE paper_run_wall_s gauge" in lines and "paper_run_wall_s 6.0" in lines
+    assert not any(line.endswith(" gauge") for line in lines if line.startswith("# TYPE paper_node_"))
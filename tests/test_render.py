@@ -0,0 +1,29 @@
+from render import RenderPlan, prune_citations
+
+
+def test_plan_renders_placeholders_and_keeps_missing_ones():
+    plan = RenderPlan("\\title{%TODO{title}}\n%TODO{document}\n%TODO{appendix}")
+    assert plan.keys == ["title", "document", "appendix"]
+    assert plan.render({"title": "A", "document": "B"}) == "\\title{A}\nB\n%TODO{appendix}"
+
+
+def test_plans_are_cached_per_file_version(tmp_path):
+    path = tmp_path / "main.tex.template"
+    path.write_text("%TODO{title}")
+    plan = RenderPlan.load(path.as_posix())
+    assert RenderPlan.load(path.as_posix()) is plan
+    path.write_text("%TODO{title} %TODO{author}")
+    assert RenderPlan.load(path.as_posix()).keys == ["title", "author"]
+
+
+def test_citations_are_pruned_to_known_keys():
+    text = "\\cite{A,B} \\citep[see][p. 3]{ C , Z } \\citet*{Y} \\cite{A}"
+    res, dropped = prune_citations(text, {"A", "C"})
+    # commands left without keys are removed entirely
+    assert res == "\\cite{A} \\citep[see][p. 3]{C}  \\cite{A}"
+    assert dropped == ["B", "Z", "Y"]
+
+
+def test_citations_with_known_keys_are_kept_verbatim():
+    text = "\\citep{ A, C }"
+    assert prune_citations(text, {"A", "C"}) == (text, [])
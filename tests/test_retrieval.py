@@ -0,0 +1,46 @@
+import pytest
+
+from retrieval import chunk, count_tokens
+
+
+def test_chunks_keep_document_order():
+    text   = "intro paragraph\n\n" + "x" * 25 + "\n\n" + "closing paragraph"
+    chunks = chunk(text, chunk_tokens=5)
+    # the oversized middle paragraph is sliced after the paragraph before it is flushed
+    assert chunks == ["intro paragraph", "x" * 20, "x" * 5, "closing paragraph"]
+
+
+def test_chunks_pack_paragraphs_within_the_limit():
+    paragraphs = [f"paragraph {i} " + "word " * 10 for i in range(20)]
+    chunks     = chunk("\n\n".join(paragraphs), chunk_tokens=40)
+    assert all(count_tokens(c) <= 40 for c in chunks)
+    assert "\n\n".join(chunks) == "\n\n".join(paragraphs)
+    assert len(chunks) < len(paragraphs)
+
+
+def test_oversized_paragraphs_split_by_lines():
+    block  = "\n".join(f"line {i} " + "y" * 10 for i in range(10))
+    chunks = chunk(block, chunk_tokens=10)
+    assert chunks[0].startswith("line 0") and chunks[-1].endswith("line 9 " + "y" * 10)
+    assert all(len(c) <= 40 for c in chunks)
+
+
+def test_lexical_index_ranks_relevant_chunks(tmp_path):
+    pytest.importorskip("numpy")
+    from retrieval import LexicalIndex
+    chunks = ["symbolic engines evaluate expressions",
+              "neural networks learn representations from data",
+              "the symbolic operator composes symbolic expressions",
+              "unrelated text about weather"]
+    index  = LexicalIndex(chunks)
+    scores = index.scores("symbolic expressions")
+    assert scores.argmax() == 2 and scores[3] == 0
+    # the best chunks within the budget, in document order
+    assert index.select("symbolic expressions", top_k=2) == [chunks[0], chunks[2]]
+    assert index.select("symbolic expressions", top_k=2, token_budget=count_tokens(chunks[2])) == [chunks[2]]
+    # persisted next to the source and rebuilt when the content changes
+    text  = "\n\n".join(chunks)
+    built = LexicalIndex.load_or_build(text, (tmp_path / "source.txt").as_posix(), chunk_tokens=10)
+    again = LexicalIndex.load_or_build(text, (tmp_path / "source.txt").as_posix(), chunk_tokens=10)
+    assert again.chunks == built.chunks and again.checksum == built.checksum
+    assert LexicalIndex.load_or_build(text + "\n\nnew", (tmp_path / "source.txt").as_posix()).checksum != built.checksum
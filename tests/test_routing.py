@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from routing import DEFAULT_TIERS, ModelRouter, Tier
+from scheduler import retry
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeEngine:
+    # answers with its model name after `latency` seconds; the first `failures` calls are rate limited
+    def __init__(self, model: str, latency: float = 0.0, failures: int = 0):
+        self.model    = model
+        self.latency  = latency
+        self.failures = failures
+        self.calls    = 0
+
+    def __call__(self, **kwargs):
+        assert kwargs['model'] == self.model
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.calls <= self.failures:
+            raise RateLimitError("Too Many Requests")
+        return self.model
+
+
+@pytest.fixture
+def engines():
+    return {tier.model: FakeEngine(tier.model) for tier in DEFAULT_TIERS.values()}
+
+
+def complete(router: ModelRouter, engines: dict, section: str) -> str:
+    # routed per attempt like `Context.invoke`: a rate limit marks the tier and the retry falls back
+    tiers = []
+    def attempt():
+        tier = router.route(section)
+        tiers.append(tier)
+        start = time.monotonic()
+        res   = engines[tier.model](**router.kwargs(tier))
+        router.record(tier, section, time.monotonic() - start)
+        return res
+    return retry(attempt, backoff=0.0, on_retry=lambda n, e: router.rate_limited(tiers[-1]))
+
+
+def test_sections_use_their_configured_tier(engines):
+    router = ModelRouter()
+    assert complete(router, engines, "Method") == "gpt-4"
+    assert complete(router, engines, "Cite") == "gpt-3.5-turbo"
+    # unlisted sections use the default tier
+    assert complete(router, engines, "Appendix") == "gpt-4-turbo"
+    assert router.report["strong"]["calls"] == 1 and router.report["fast"]["calls"] == 1
+    assert sum(entry["fallbacks"] for entry in router.report.values()) == 0
+
+
+def test_rate_limited_tier_falls_back_on_retry(engines):
+    router = ModelRouter()
+    engines["gpt-4"].failures = 1
+    assert complete(router, engines, "Method") == "gpt-4-turbo"
+    assert engines["gpt-4"].calls == 1 and engines["gpt-4-turbo"].calls == 1
+    assert router.report["strong"]["rate_limits"] == 1
+    assert router.report["standard"]["fallbacks"] == 1
+    # later sections routed to the limited tier fall back as well, down the chain if needed
+    engines["gpt-4-turbo"].failures = 2
+    assert complete(router, engines, "Algorithm") == "gpt-3.5-turbo"
+
+
+def test_pressure_expires_after_the_cooldown(engines):
+    router = ModelRouter(cooldown=0.05)
+    router.rate_limited(router.tiers["strong"])
+    assert router.route("Method").name == "standard"
+    time.sleep(0.06)
+    assert router.route("Method").name == "strong"
+
+
+def test_long_limiter_waits_signal_pressure():
+    router = ModelRouter(max_wait=1.0)
+    router.waited(router.tiers["strong"], 0.5)
+    assert router.route("Method").name == "strong"
+    router.waited(router.tiers["strong"], 2.0)
+    assert router.route("Method").name == "standard"
+
+
+def test_deadline_moves_slow_tiers_to_faster_ones():
+    tiers   = {"fast": Tier("fast", "fast-model", 128),
+               "slow": Tier("slow", "slow-model", 128, fallback="fast")}
+    engines = {"fast-model": FakeEngine("fast-model"), "slow-model": FakeEngine("slow-model", latency=0.05)}
+    router  = ModelRouter(tiers=tiers, routes={"Method": "slow"}, default="fast", deadline=0.08)
+    router.start()
+    assert complete(router, engines, "Method") == "slow-model"
+    # another slow call would end after the deadline
+    time.sleep(0.04)
+    assert complete(router, engines, "Method") == "fast-model"
+    assert router.report["fast"]["fallbacks"] == 1
+
+
+def test_cost_follows_tier_prices():
+    router = ModelRouter()
+    router.record(router.tiers["strong"], "Method", 1.0, prompt_tokens=1000, completion_tokens=500)
+    assert router.report["strong"]["cost"] == pytest.approx(0.03 + 0.03)
+    assert "gpt-4" in router.view()
@@ -0,0 +1,170 @@
+import time
+
+import pytest
+
+from scheduler import RateLimiter, Scheduler, dependencies, is_rate_limit, phases, retry
+
+
+class Response:
+    status_code = 429
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class StatusError(Exception):
+    def __init__(self, message, status_code=None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response    = response
+
+
+def test_rate_limits_are_recognized_by_status_or_type():
+    assert is_rate_limit(StatusError("Too Many Requests", status_code=429))
+    assert is_rate_limit(StatusError("Too Many Requests", response=Response()))
+    assert is_rate_limit(RateLimitError("slow down"))
+    try:
+        raise RuntimeError("engine failed") from StatusError("Too Many Requests", status_code=429)
+    except RuntimeError as e:
+        assert is_rate_limit(e)
+
+
+def test_messages_mentioning_429_are_not_rate_limits():
+    assert not is_rate_limit(StatusError("This model's maximum context length is 8192 tokens. "
+                                         "However, your messages resulted in 14290 tokens.", status_code=400))
+    assert not is_rate_limit(ValueError("rate limit of the parser exceeded"))
+
+
+def test_retry_only_on_rate_limits():
+    calls = []
+    def context_length():
+        calls.append(1)
+        raise StatusError("resulted in 14290 tokens", status_code=400)
+    with pytest.raises(StatusError):
+        retry(context_length, backoff=0)
+    assert len(calls) == 1
+
+    attempts = []
+    def limited():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError("Too Many Requests", status_code=429)
+        return "ok"
+    retried = []
+    assert retry(limited, backoff=0, on_retry=lambda attempt, e: retried.append(attempt)) == "ok"
+    assert retried == [0, 1]
+
+
+class Node:
+    adapts     = []
+    children   = []
+    body       = True
+    needs_body = False
+
+
+class Method(Node):
+    def __init__(self, *adapts):
+        self.adapts = list(adapts)
+
+
+class Cite(Node):
+    body = False
+
+
+class RelatedWork(Node):
+    def __init__(self, *citations):
+        self.children = list(citations)
+
+
+class Introduction(Node):
+    pass
+
+
+class Abstract(Node):
+    body       = False
+    needs_body = True
+
+
+class SleepingEngine:
+    # fake model: every call takes `latency` seconds; records the order of calls
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls   = []
+
+    def __call__(self, j, results):
+        time.sleep(self.latency)
+        self.calls.append(j)
+        return j
+
+
+def test_dependencies_follow_adapted_types_and_the_body():
+    nodes = [RelatedWork(Cite()), Method(RelatedWork, Cite), Introduction(), Abstract()]
+    deps  = dependencies(nodes)
+    # Method adapts RelatedWork directly and through its Cite child; Abstract summarizes the body
+    assert deps == {0: {1}, 1: set(), 2: set(), 3: {0, 1, 2}}
+    assert phases(deps) == [[1, 2], [0], [3]]
+
+
+def test_results_respect_dependencies():
+    nodes  = [RelatedWork(Cite()), Method(RelatedWork), Introduction(), Abstract()]
+    engine = SleepingEngine(0.01)
+    seen   = {}
+    def run(j, results):
+        seen[j] = list(results)
+        return engine(j, results)
+    assert Scheduler(max_workers=4)(nodes, run) == [0, 1, 2, 3]
+    assert seen[0][1] == 1
+    assert [seen[3][i] for i in (0, 1, 2)] == [0, 1, 2]
+    assert engine.calls.index(1) < engine.calls.index(0) < engine.calls.index(3)
+
+
+def test_independent_sections_run_concurrently():
+    nodes = [Introduction() for _ in range(8)] + [Abstract()]
+    start = time.monotonic()
+    Scheduler(max_workers=1)(nodes, SleepingEngine(0.05))
+    sequential = time.monotonic() - start
+    start = time.monotonic()
+    scheduler = Scheduler(max_workers=8)
+    scheduler(nodes, SleepingEngine(0.05))
+    concurrent = time.monotonic() - start
+    # two phases of 50 ms instead of nine sequential calls
+    assert concurrent < sequential / 2.5
+    assert [phase["nodes"] for phase in scheduler.report(nodes)] == [["Introduction"] * 8, ["Abstract"]]
+
+
+def test_cyclic_dependencies_are_rejected():
+    with pytest.raises(AssertionError):
+        Scheduler()([Node(), Node()], SleepingEngine(0.0), deps={0: {1}, 1: {0}})
+
+
+def test_rate_limiter_admits_a_burst_then_throttles():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=1_000_000)
+    # a full bucket admits its capacity without waiting
+    assert sum(limiter.acquire() for _ in range(600)) < 0.05
+    # then one request per 100 ms
+    waited = limiter.acquire()
+    assert 0.05 < waited < 0.3
+
+
+def test_rate_limiter_throttles_on_tokens():
+    limiter = RateLimiter(requests_per_minute=1_000, tokens_per_minute=6_000)
+    assert limiter.acquire(6_000) < 0.01
+    # 600 tokens refill in 6 s at 100 tokens per second; 20 tokens in 0.2 s
+    waited = limiter.acquire(20)
+    assert 0.1 < waited < 0.5
+    assert limiter.waited >= waited
+    # a request larger than the bucket is admitted once the bucket is full
+    assert RateLimiter(tokens_per_minute=100).acquire(1_000) < 0.01
+
+
+def test_stream_yields_sections_as_they_complete():
+    latency = {0: 0.15, 1: 0.0, 2: 0.05}
+    def run(j, results):
+        time.sleep(latency.get(j, 0.0))
+        return j
+    nodes   = [Introduction(), Introduction(), Introduction(), Abstract()]
+    arrived = [(j, time.monotonic()) for j, _ in Scheduler(max_workers=4).stream(nodes, run)]
+    # fastest first; the abstract waits for the whole body
+    assert [j for j, _ in arrived] == [1, 2, 0, 3]
+    assert arrived[1][1] - arrived[0][1] < 0.12
@@ -0,0 +1,57 @@
+import hashlib
+import os
+
+from summaries import SummaryIndex, precompute
+
+
+def read(path):
+    with open(path) as file:
+        return file.read()
+
+
+class Summarizer:
+    def __init__(self):
+        self.keys = []
+
+    def __call__(self, key, text):
+        self.keys.append(key)
+        return f"summary of {text}"
+
+
+def test_index_serves_summaries_of_unchanged_sources(tmp_path):
+    index = SummaryIndex((tmp_path / "index.json").as_posix())
+    index.put("A:24", "hash", [1, 2], "summary")
+    assert index.get("A:24", "hash") == "summary"
+    assert index.get("A:24", "other") is None and index.get("B:24", "hash") is None
+    index.save()
+    assert SummaryIndex(index.path).get("A:24", "hash") == "summary"
+
+
+def test_precompute_summarizes_only_changed_papers(tmp_path):
+    papers = tmp_path / "papers"
+    papers.mkdir()
+    (papers / "A:24.txt").write_text("paper a")
+    (papers / "B:24.txt").write_text("paper b")
+    index      = SummaryIndex((tmp_path / "index.json").as_posix())
+    summarizer = Summarizer()
+    assert precompute(papers.as_posix(), index, read, summarizer)["built"] == 2
+
+    # untouched papers hit the index without a model call
+    stats = precompute(papers.as_posix(), SummaryIndex(index.path), read, summarizer)
+    assert (stats["reused"], stats["built"]) == (2, 0)
+
+    # a touched but unchanged paper is reused, an edited one is summarized again
+    stat = os.stat(papers / "A:24.txt")
+    os.utime(papers / "A:24.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (papers / "B:24.txt").write_text("paper b, revised")
+    summarizer.keys = []
+    index = SummaryIndex(index.path)
+    stats = precompute(papers.as_posix(), index, read, summarizer)
+    assert (stats["reused"], stats["built"]) == (1, 1) and summarizer.keys == ["B:24"]
+    revised = hashlib.sha256("paper b, revised".encode('utf-8')).hexdigest()
+    assert index.get("B:24", revised) == "summary of paper b, revised"
+
+    # papers removed from the corpus are dropped from the index
+    (papers / "A:24.txt").unlink()
+    assert precompute(papers.as_posix(), index, read, summarizer)["removed"] == 1
+    assert "A:24" not in SummaryIndex(index.path).entries
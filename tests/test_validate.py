@@ -0,0 +1,47 @@
+from validate import LatexRules, headings, validate_latex
+
+
+def test_valid_section_has_no_errors():
+    text = ("\\section{Method}\nWe define \\(\\alpha\\) and \\textbf{bold} text \\citep{Newell:56}.\n"
+            "\\begin{equation}\nx = \\frac{1}{2}\n\\end{equation}\n\\paragraph{Details} More text.")
+    assert validate_latex(text) == []
+
+
+def test_structural_errors_name_their_line():
+    errors = validate_latex("\\section{Method}\n\\begin{itemize}\n\\item one\n\\end{enumerate}\n{unclosed")
+    assert "line 2: environment `itemize` is not allowed." in errors
+    assert "line 3: command `\\item` is not allowed here." in errors
+    assert "line 4: `\\end{enumerate}` closes `\\begin{itemize}` from line 2." in errors
+    assert "line 5: unmatched `{`." in errors
+
+
+def test_template_commands_are_rejected():
+    errors = validate_latex("\\documentclass{article}\n\\begin{document}\ntext\n\\end{document}")
+    assert any("belongs to the template preamble" in error for error in errors)
+    assert any("`\\begin{document}` is provided by the template" in error for error in errors)
+
+
+def test_rules_extend_the_whitelist():
+    text = "\\begin{abstract}An abstract.\\end{abstract}"
+    assert validate_latex(text) != []
+    assert validate_latex(text, LatexRules(environments={'abstract'})) == []
+
+
+def test_math_and_verbatim_content():
+    assert validate_latex("$x^2 \\mathbb{R}$ and \\begin{lstlisting}\n\\anything{\n\\end{lstlisting}") == []
+    assert validate_latex("$x^2") == ["line 1: math started with `$` is never closed."]
+
+
+def test_duplicate_headings_within_a_section():
+    errors = validate_latex("\\section{Method}\ntext\n\\section{method}\n\\paragraph{} text")
+    assert errors == ["line 3: duplicated \\section `method` (first on line 1).",
+                      "line 4: `\\paragraph` needs a name."]
+
+
+def test_headings_already_in_the_document_are_rejected():
+    existing = set(headings("\\section{Introduction}\n\\subsection{Background}"))
+    assert existing == {("section", "introduction"), ("subsection", "background")}
+    errors   = validate_latex("\\section{Related Work}\n\\subsection{ background }", existing=existing)
+    assert errors == ["line 2: \\subsection `background` already exists in the document; use another name or leave it out."]
+    # the same name at another level is a different heading
+    assert validate_latex("\\subsection{Introduction}", existing=existing) == []